@@ -0,0 +1,74 @@
+# Measure cold import time of the shared library and the app entry points.
+#
+# Each target is imported in a fresh interpreter so nothing is cached between
+# runs. The report shows the median wall time and which heavy dependencies the
+# import pulled in, e.g.
+#
+#     python benchmarks/import_time.py --repeat 5 --max-ms 2000
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Library modules are imported by name, entry points are run as scripts with Streamlit in bare mode
+library_targets = ['pdfcreator', 'pdfcreator.ids', 'pdfcreator.sheets', 'pdfcreator.template', 'pdfcreator.preview']
+entry_point_targets = ['pdfmaker.py', 'zipfilecode.py', 'zipfilewithimageincluded.py', 'theultimatefinal.py', 'pdfdetailsupper.py', 'singleappcode.py']
+
+heavy_modules = ['streamlit', 'pandas', 'numpy', 'fpdf']
+
+probe = '''
+import json, logging, sys, time
+logging.disable(logging.CRITICAL)
+target = sys.argv[1]
+start = time.perf_counter()
+if target.endswith('.py'):
+    import runpy
+    runpy.run_path(target, run_name='__main__')
+else:
+    __import__(target)
+elapsed = time.perf_counter() - start
+print(json.dumps({'seconds': elapsed, 'loaded': [m for m in %r if m in sys.modules]}))
+''' % (heavy_modules,)
+
+def measure(target, repeat):
+    timings = []
+    loaded = []
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, '-c', probe, target],
+            cwd=REPO_ROOT,
+            env=dict(os.environ, PYTHONPATH=REPO_ROOT),
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        sample = json.loads(completed.stdout.strip().splitlines()[-1])
+        timings.append(sample['seconds'] * 1000)
+        loaded = sample['loaded']
+    return statistics.median(timings), loaded
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold import time of the attendance apps")
+    parser.add_argument('--repeat', type=int, default=3, help="fresh interpreters per target")
+    parser.add_argument('--max-ms', type=float, default=None, help="fail if any target is slower than this")
+    parser.add_argument('targets', nargs='*', help="module names or entry point scripts (default: all)")
+    args = parser.parse_args()
+
+    targets = args.targets or library_targets + entry_point_targets
+    slow_targets = []
+    for target in targets:
+        median_ms, loaded = measure(target, args.repeat)
+        print(f"{target:32} {median_ms:9.1f} ms   loads: {', '.join(loaded) or '-'}")
+        if args.max_ms is not None and median_ms > args.max_ms:
+            slow_targets.append(target)
+
+    if slow_targets:
+        print(f"Over budget ({args.max_ms} ms): {', '.join(slow_targets)}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
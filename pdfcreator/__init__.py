@@ -0,0 +1,3 @@
+# Shared library for the attendance apps. Submodules import their heavy
+# dependencies (pandas, numpy, fpdf) on first use, so keep this file empty
+# of imports to let each entry point load only what it needs.
@@ -0,0 +1,186 @@
+# Sharded attendance archives: one zip per District (or District/Block), or size-capped volumes.
+# PDFs are rendered on the shared render pool and taken in order while finished shards are compressed on a thread pool,
+# so the first shard can be downloaded while later ones are still being built.
+import hashlib
+import io
+import json
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from pdfcreator import rosters as roster_workbooks, sheets
+from pdfcreator.pagination import render_school_pdfs, student_positions
+
+# Shard levels for each archive mode; volumes keep the District/Block folders but split by size
+archive_modes = {
+    'single': (),
+    'district': ('DISTRICT',),
+    'district_block': ('DISTRICT', 'BLOCK'),
+    'volumes': ()
+}
+
+def safe_path_part(value):
+    # Names are used as folder and file names inside the archives
+    text = str(value).strip() or 'NA'
+    for char in '/\\:*?"<>|':
+        text = text.replace(char, '_')
+    return text
+
+def entry_path(record):
+    # Organize entries as District/Block/attendance_list_{school_code}.pdf
+    school_code = record.get('School Code', 'default_code')
+    folders = [safe_path_part(record.get(level, 'NA')) for level in ('DISTRICT', 'BLOCK') if level in record]
+    return '/'.join(folders + [f'attendance_list_{school_code}.pdf'])
+
+def shard_name(record, levels):
+    return '_'.join(safe_path_part(record.get(level, 'NA')) for level in levels) or 'attendance_Sheets'
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as archive_file:
+        for chunk in iter(lambda: archive_file.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def write_shard(target, entries, deterministic=False):
+    with zipfile.ZipFile(target, 'w', compression=zipfile.ZIP_DEFLATED) as zip_file:
+        for path, pdf_data in entries:
+            sheets.write_zip_entry(zip_file, path, pdf_data, deterministic)
+
+def compress_shard(name, entries, deterministic=False, output_dir=None):
+    # With output_dir the zip is written to output_dir/{name}.zip and returned by 'path' instead of 'data'
+    file_name = f'{name}.zip'
+    if output_dir is None:
+        zip_buffer = io.BytesIO()
+        write_shard(zip_buffer, entries, deterministic)
+        data = zip_buffer.getvalue()
+        stored = {'data': data, 'size': len(data), 'sha256': hashlib.sha256(data).hexdigest()}
+    else:
+        path = os.path.join(output_dir, file_name)
+        with open(path, 'wb') as archive_file:
+            write_shard(archive_file, entries, deterministic)
+        stored = {'path': path, 'size': os.path.getsize(path), 'sha256': file_sha256(path)}
+
+    return {
+        'name': name,
+        'file_name': file_name,
+        **stored,
+        'school_count': sum(path.endswith('.pdf') for path, _ in entries),
+        'entries': [
+            {'path': path, 'size': len(pdf_data), 'sha256': hashlib.sha256(pdf_data).hexdigest()}
+            for path, pdf_data in entries
+        ]
+    }
+
+def close_shard(df, entries, shard_records, rosters, deterministic, students=None):
+    # In 'sheet' mode each shard gets one workbook covering its schools
+    if rosters == 'sheet':
+        entries.append(('rosters.xlsx', roster_workbooks.write_roster_workbook(df, shard_records, deterministic, students)))
+    return entries
+
+def iter_shard_entries(df, result, image_path, mode, max_volume_bytes=None, font_path=None, layout=None, barcodes=False, deterministic=False, rosters=None):
+    levels = archive_modes[mode]
+    if levels:
+        result = sorted(result, key=lambda record: tuple(str(record.get(level, '')) for level in levels))
+    workbooks = roster_workbooks.iter_school_workbooks(df, result, deterministic=deterministic) if rosters == 'workbook' else None
+    # One student lookup for every shard's roster workbook
+    students = student_positions(df, result) if rosters == 'sheet' else None
+
+    # A volume's rosters.xlsx is only written when the volume closes, so its size is reserved
+    # up front: the empty workbook once, and each school's sheet as the school is added
+    sheet_sizes = mode == 'volumes' and rosters == 'sheet'
+    base_size = roster_workbooks.empty_workbook_size(deterministic) if sheet_sizes else 0
+
+    current_name = None
+    volume_number = 0
+    entries = []
+    entries_size = base_size
+    shard_records = []
+    pdf_datas = render_school_pdfs(df, result, image_path, font_path=font_path, layout=layout, barcodes=barcodes, deterministic=deterministic)
+    for record, pdf_data in zip(result, pdf_datas):
+        workbook = next(workbooks) if workbooks is not None else None
+
+        # Everything this school adds to its shard, checked against the cap as one unit
+        school_size = len(pdf_data) + (len(workbook) if workbook is not None else 0)
+        if sheet_sizes:
+            school_size += roster_workbooks.sheet_size(students, record, deterministic)
+
+        if mode == 'volumes':
+            # Start a new volume when the next school would overflow the current one
+            if entries and entries_size + school_size > max_volume_bytes:
+                yield current_name, close_shard(df, entries, shard_records, rosters, deterministic, students)
+                entries, entries_size, shard_records = [], base_size, []
+            if not entries:
+                volume_number += 1
+                current_name = f'attendance_Sheets_part{volume_number:03d}'
+            path = entry_path(record)
+        else:
+            # Start a new shard when the District/Block group changes
+            name = shard_name(record, levels)
+            if entries and name != current_name:
+                yield current_name, close_shard(df, entries, shard_records, rosters, deterministic, students)
+                entries, entries_size, shard_records = [], base_size, []
+            current_name = name
+            path = entry_path(record) if levels else os.path.basename(entry_path(record))
+
+        entries.append((path, pdf_data))
+        if workbook is not None:
+            entries.append((roster_workbooks.roster_path(path), workbook))
+        entries_size += school_size
+        shard_records.append(record)
+
+    if entries:
+        yield current_name, close_shard(df, entries, shard_records, rosters, deterministic, students)
+
+def build_sharded_archives(df, result, image_path, mode='district', max_volume_bytes=None, workers=None, font_path=None, autofit=False, barcodes=False, deterministic=False, rosters=None, output_dir=None):
+    # Yield each finished shard as soon as it is compressed; shards finish in any order
+    if mode == 'volumes' and not max_volume_bytes:
+        raise ValueError("max_volume_bytes is required for the 'volumes' archive mode")
+
+    workers = workers or min(4, os.cpu_count() or 1)
+    layout = sheets.batch_layout(df, result, font_path, barcodes) if autofit else None
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for name, entries in iter_shard_entries(df, result, image_path, mode, max_volume_bytes, font_path, layout, barcodes, deterministic, rosters):
+            pending.add(executor.submit(compress_shard, name, entries, deterministic, output_dir))
+
+            # Hand back whatever finished while this shard was rendering
+            done = {future for future in pending if future.done()}
+            pending -= done
+            for future in done:
+                yield future.result()
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+def build_manifest(shards, mode):
+    manifest = {
+        'mode': mode,
+        'shard_count': len(shards),
+        'school_count': sum(shard['school_count'] for shard in shards),
+        'shards': [
+            {key: shard[key] for key in ('name', 'file_name', 'size', 'sha256', 'school_count', 'entries')}
+            for shard in sorted(shards, key=lambda shard: shard['name'])
+        ]
+    }
+    return json.dumps(manifest, indent=2).encode('utf-8')
+
+def render_archives(df, result, image, mode='single', max_volume_bytes=None, font_path=None, autofit=False, barcodes=False, deterministic=False, rosters=None, output_dir=None):
+    # Scheduler job: yields finished archives; image is the logo bytes or a path/URL.
+    # With output_dir each archive is written to a file there and yielded by 'path' and 'size'
+    with sheets.temporary_image(image) as image_path:
+        if mode == 'single':
+            archive = {'name': 'attendance_Sheets', 'file_name': 'attendance_Sheets.zip', 'entries': result}
+            options = dict(font_path=font_path, autofit=autofit, barcodes=barcodes, deterministic=deterministic, rosters=rosters)
+            if output_dir is None:
+                archive['data'] = sheets.generate_attendance_zip(df, result, image_path, **options)
+            else:
+                archive['path'] = os.path.join(output_dir, archive['file_name'])
+                with open(archive['path'], 'wb') as archive_file:
+                    sheets.generate_attendance_zip(df, result, image_path, output=archive_file, **options)
+                archive['size'] = os.path.getsize(archive['path'])
+            yield archive
+        else:
+            yield from build_sharded_archives(df, result, image_path, mode, max_volume_bytes, font_path=font_path, autofit=autofit, barcodes=barcodes, deterministic=deterministic, rosters=rosters, output_dir=output_dir)
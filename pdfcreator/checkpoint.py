@@ -0,0 +1,221 @@
+# Resumable batch runs. Every rendered school PDF is written to a durable job directory
+# and appended to a checkpoint journal with its checksum, so a rerun of the same input
+# skips finished schools. The archive is only built once every school is present; the
+# PDFs are then dropped, and job directories unused for job_retention_days are removed.
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+
+from pdfcreator import sheets
+from pdfcreator.pagination import iter_school_parts, merge_school
+
+# Survives browser disconnects; mount a volume here to also survive container restarts
+job_root_env = 'PDFCREATOR_JOB_DIR'
+
+# Finished or abandoned jobs are kept this long after they were last written or downloaded
+job_retention_days = float(os.environ.get('PDFCREATOR_JOB_RETENTION_DAYS', 7))
+
+def default_job_root():
+    return os.environ.get(job_root_env) or os.path.join(os.path.expanduser('~'), '.cache', 'pdfcreator', 'jobs')
+
+def job_key(df, image_bytes, options):
+    # Same roster, logo and options resume the same job
+    import pandas as pd
+
+    if hasattr(df, 'students'):
+        raise ValueError("Resumable runs key jobs on the student frame; a CompactRoster is not supported")
+    digest = hashlib.sha256()
+    digest.update(json.dumps([str(col) for col in df.columns]).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df.astype(str), index=False).values.tobytes())
+    digest.update(hashlib.sha256(image_bytes).digest())
+    digest.update(json.dumps(options, sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()[:32]
+
+def last_used(path):
+    # The journal is appended per school and the archive touched per download
+    times = [
+        os.path.getmtime(os.path.join(path, name))
+        for name in ('checkpoint.jsonl', 'attendance_Sheets.zip', 'manifest.json')
+        if os.path.exists(os.path.join(path, name))
+    ]
+    return max(times, default=os.path.getmtime(path))
+
+def prune_job_dirs(root, max_age_days=None, keep=()):
+    # Remove job directories not used within max_age_days; returns the removed job keys
+    max_age_days = job_retention_days if max_age_days is None else max_age_days
+    if not os.path.isdir(root):
+        return []
+    cutoff = time.time() - max_age_days * 24 * 60 * 60
+    removed = []
+    for key in os.listdir(root):
+        path = os.path.join(root, key)
+        if key in keep or not os.path.isdir(path):
+            continue
+        try:
+            if last_used(path) < cutoff:
+                shutil.rmtree(path)
+                removed.append(key)
+        except OSError:
+            continue  # removed or being written by another session
+    return removed
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def temporary_path(path):
+    # A unique name next to path; sessions resuming the same job never share a temp file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path) + '.', suffix='.part')
+    os.close(fd)
+    return tmp_path
+
+def write_atomic(path, data):
+    tmp_path = temporary_path(path)
+    try:
+        with open(tmp_path, 'wb') as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+class JobDirectory:
+    def __init__(self, root, key):
+        self.path = os.path.join(root, key)
+        self.pdf_dir = os.path.join(self.path, 'pdfs')
+        self.journal_path = os.path.join(self.path, 'checkpoint.jsonl')
+        self.manifest_path = os.path.join(self.path, 'manifest.json')
+        self.archive_path = os.path.join(self.path, 'attendance_Sheets.zip')
+        # A finished job keeps only its archive
+        os.makedirs(self.path if os.path.exists(self.archive_path) else self.pdf_dir, exist_ok=True)
+        self.completed = self._load_journal()
+
+    def _load_journal(self):
+        completed = {}
+        if not os.path.exists(self.journal_path):
+            return completed
+        with open(self.journal_path, encoding='utf-8') as journal:
+            for line in journal:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break  # a partial last line from an interrupted write
+                completed[entry['file']] = entry
+        return completed
+
+    def is_complete(self, file_name):
+        # Trust a checkpoint only if the file on disk still matches its checksum
+        entry = self.completed.get(file_name)
+        pdf_path = os.path.join(self.pdf_dir, file_name)
+        if entry is None or not os.path.exists(pdf_path):
+            return False
+        return os.path.getsize(pdf_path) == entry['size'] and file_sha256(pdf_path) == entry['sha256']
+
+    def record(self, file_name, pdf_data):
+        write_atomic(os.path.join(self.pdf_dir, file_name), pdf_data)
+        entry = {'file': file_name, 'size': len(pdf_data), 'sha256': hashlib.sha256(pdf_data).hexdigest()}
+        with open(self.journal_path, 'a', encoding='utf-8') as journal:
+            journal.write(json.dumps(entry) + '\n')
+            journal.flush()
+            os.fsync(journal.fileno())
+        self.completed[file_name] = entry
+
+    def finalize(self, file_names, deterministic=False):
+        # Build the archive next to the PDFs and only then publish it under its final name
+        tmp_path = temporary_path(self.archive_path)
+        try:
+            with zipfile.ZipFile(tmp_path, 'w') as zip_file:
+                for file_name in file_names:
+                    if deterministic:
+                        with open(os.path.join(self.pdf_dir, file_name), 'rb') as pdf_file:
+                            sheets.write_zip_entry(zip_file, file_name, pdf_file.read(), deterministic)
+                    else:
+                        zip_file.write(os.path.join(self.pdf_dir, file_name), file_name)
+            os.replace(tmp_path, self.archive_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+        manifest = {
+            'school_count': len(file_names),
+            'archive_sha256': file_sha256(self.archive_path),
+            'entries': [self.completed[file_name] for file_name in file_names]
+        }
+        write_atomic(self.manifest_path, json.dumps(manifest, indent=2).encode('utf-8'))
+        self.drop_pdfs()
+
+    def drop_pdfs(self):
+        # The archive holds every PDF once it exists; keeping both would double the disk use
+        shutil.rmtree(self.pdf_dir, ignore_errors=True)
+
+def run_resumable_batch(df, result, image_path, job_dir, font_path=None, autofit=False, barcodes=False, deterministic=False):
+    # Render every school not already checkpointed; returns per-run counts and failures
+    layout = sheets.batch_layout(df, result, font_path, barcodes) if autofit else None
+    file_names = [f"attendance_list_{record.get('School Code', 'default_code')}.pdf" for record in result]
+    pending = {}
+    for file_name, record in zip(file_names, result):
+        if file_name not in pending and not job_dir.is_complete(file_name):
+            pending[file_name] = record
+
+    # Unfinished schools render on the shared pool; each is checkpointed as soon as it is merged
+    failed = {}
+    rendered = 0
+    school_parts = iter_school_parts(df, list(pending.values()), image_path, font_path=font_path, layout=layout, barcodes=barcodes, deterministic=deterministic)
+    for file_name, parts in zip(pending, school_parts):
+        try:
+            job_dir.record(file_name, merge_school(parts))
+        except Exception as error:
+            # One bad record (or a failed write) must not lose the rest of the run
+            failed[file_name] = str(error)
+            continue
+        rendered += 1
+
+    if not failed and not os.path.exists(job_dir.archive_path):
+        try:
+            job_dir.finalize(file_names, deterministic)
+        except FileNotFoundError:
+            # Another session resuming the same job finished first and has dropped the PDFs
+            if not os.path.exists(job_dir.archive_path):
+                raise
+    return {'rendered': rendered, 'resumed': len(file_names) - rendered - len(failed), 'failed': failed}
+
+def render_resumable_archive(df, result, image, job_root=None, font_path=None, autofit=False, barcodes=False, deterministic=False, rosters=None):
+    # Scheduler job: like archive.render_archives in single mode, but checkpointed on disk
+    if rosters:
+        raise ValueError("Excel rosters are not checkpointed; run without 'Resumable run' to include them")
+    image_bytes = image.encode('utf-8') if isinstance(image, str) else image
+    options = {'font': font_path and os.path.basename(font_path), 'autofit': autofit, 'barcodes': barcodes, 'deterministic': deterministic}
+    job_root = job_root or default_job_root()
+    key = job_key(df, image_bytes, options)
+    prune_job_dirs(job_root, keep=(key,))
+    job_dir = JobDirectory(job_root, key)
+
+    if not os.path.exists(job_dir.archive_path):
+        with sheets.temporary_image(image) as image_path:
+            summary = run_resumable_batch(df, result, image_path, job_dir, font_path=font_path, autofit=autofit, barcodes=barcodes, deterministic=deterministic)
+        # A session resuming the same job may have built the archive while this one was rendering
+        if summary['failed'] and not os.path.exists(job_dir.archive_path):
+            failed = ', '.join(sorted(summary['failed']))
+            raise RuntimeError(f"{len(summary['failed'])} schools failed ({failed}); rerun to retry them, finished schools are kept")
+        # A session that opened the job before the archive appeared may have recreated the PDF
+        # folder since it was dropped; each session clears it again after its own last write
+        job_dir.drop_pdfs()
+
+    # A downloaded archive counts as used for the retention period
+    os.utime(job_dir.archive_path)
+    with open(job_dir.archive_path, 'rb') as archive_file:
+        yield {
+            'name': 'attendance_Sheets',
+            'file_name': 'attendance_Sheets.zip',
+            'data': archive_file.read(),
+            'entries': result
+        }
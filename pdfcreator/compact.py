@@ -0,0 +1,246 @@
+# Compact in-memory student roster. Each student is a school index, grade and sequence
+# number in small integer arrays (about 10 bytes, plus the passcode), and the school,
+# block and district names are held once per school. Students of a school are contiguous,
+# so offsets[i]:offsets[i + 1] are school i's rows. Formatted IDs are only built for the
+# rows being exported or rendered, and match what ids.process_data produces, including the
+# single row without a student number that process_data writes for a school with no students.
+#
+# singleappcode.py and the service build one instead of the process_data frames: exports go
+# through iter_expanded_frames / iter_mapped_frames, and the roster stands in for the student
+# frame when rendering (auto-fit and the barcode check read it through iter_column). Resumable
+# runs are the exception: checkpoint.job_key hashes a frame and raises ValueError for a roster.
+from pdfcreator.ids import parameter_mapping
+
+class CompactRoster:
+    def __init__(self, schools, counts, partner_id, grade, student_digits, selected_param, inputs=None):
+        import numpy as np
+
+        # schools: one row per input school with the names and the zero-padded ID parts;
+        # inputs: the uploaded rows with process_data's per-school columns, for the Student_Ids export
+        self.schools = schools.reset_index(drop=True)
+        self.inputs = inputs.reset_index(drop=True) if inputs is not None else None
+        self.partner_id = str(partner_id)
+        self.student_digits = student_digits
+        self.selected_param = selected_param
+        self.class_grade = grade
+
+        # A school without students still gets one row, as the explode in process_data leaves it
+        counts = np.asarray(counts, dtype=np.int64)
+        placeholders = counts <= 0
+        counts = np.where(placeholders, 1, counts)
+        self.offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.offsets[1:])
+        total = int(self.offsets[-1])
+
+        index_dtype = np.uint16 if len(counts) < 2 ** 16 else np.uint32
+        self.school_index = np.repeat(np.arange(len(counts), dtype=index_dtype), counts)
+        self.grade = np.full(total, grade, dtype=np.min_scalar_type(grade))
+        self.sequence = (np.arange(total, dtype=np.int64) - np.repeat(self.offsets[:-1], counts) + 1).astype(np.uint32)
+        self.sequence[self.offsets[:-1][placeholders]] = 0  # no student number
+        self.gender = np.random.randint(0, 2, size=total, dtype=np.uint8)
+        self.passcodes = None
+        self._schools_by_code = None
+
+    @classmethod
+    def from_excel(cls, uploaded_file, partner_id, buffer_percent, grade, district_digits, block_digits, school_digits, student_digits, selected_param):
+        # Same inputs and ID rules as ids.process_data, without one row per student
+        import numpy as np
+        import pandas as pd
+
+        data = pd.read_excel(uploaded_file)
+
+        def id_part(column, digits):
+            # 1-based position of first appearance, "0" for "NA", zero-padded
+            codes = pd.factorize(data[column], use_na_sentinel=False)[0] + 1
+            ids = pd.Series(codes, index=data.index).astype(str).str.zfill(digits)
+            return ids.where(data[column] != "NA", "0".zfill(digits))
+
+        # The per-school columns process_data adds, in the same order
+        data['Partner_ID'] = str(partner_id)
+        data['Grade'] = grade
+        data['District_ID'] = id_part('District', district_digits)
+        data['Block_ID'] = id_part('Block', block_digits)
+        data['School_ID'] = id_part('School_ID', school_digits)
+        data['Total_Students_With_Buffer'] = np.floor(data['Total_Students'] * (1 + buffer_percent / 100))
+
+        schools = data[['District_ID', 'Block_ID', 'School_ID', 'School', 'District', 'Block']]
+        counts = data['Total_Students_With_Buffer'].fillna(0).clip(lower=0).astype(np.int64)
+        return cls(schools, counts, partner_id, grade, student_digits, selected_param, inputs=data)
+
+    def __len__(self):
+        return len(self.school_index)
+
+    @property
+    def nbytes(self):
+        arrays = [self.offsets, self.school_index, self.grade, self.sequence, self.gender]
+        if self.passcodes is not None:
+            arrays.append(self.passcodes)
+        return sum(array.nbytes for array in arrays) + int(self.schools.memory_usage(deep=True).sum())
+
+    def add_passcodes(self, length=6):
+        # Kept as fixed-width bytes, one byte per character
+        from pdfcreator.passcodes import generate_passcodes
+
+        self.passcodes = generate_passcodes(len(self), length).astype(f'S{length}')
+
+    def _rows(self, rows):
+        import numpy as np
+
+        if rows is None:
+            return np.arange(len(self))
+        if isinstance(rows, slice):
+            return np.arange(*rows.indices(len(self)))
+        return np.asarray(rows)
+
+    def _school_column(self, column, schools):
+        # A Series keeps the column's dtype, as the per-student frame has it
+        return self.schools[column].iloc[schools].reset_index(drop=True)
+
+    def student_ids(self, rows=None):
+        # Student_IDs: School_ID, two-digit grade and the zero-padded sequence number
+        import pandas as pd
+
+        rows = self._rows(rows)
+        school_ids = pd.Series(self._school_column('School_ID', self.school_index[rows]), dtype=str)
+        grades = pd.Series(self.grade[rows]).astype(str).str.zfill(2)
+        sequence = pd.Series(self.sequence[rows]).astype(str).str.zfill(self.student_digits)
+        return (school_ids + grades + sequence).where(self.sequence[rows] > 0, '').to_numpy()
+
+    def custom_ids(self, rows=None):
+        # Custom_ID from the selected parameter set, as ids.generate_custom_id builds it
+        import pandas as pd
+
+        rows = self._rows(rows)
+        schools = self.school_index[rows]
+        parts = {
+            'Partner_ID': lambda: pd.Series([self.partner_id] * len(rows), dtype=str),
+            'District_ID': lambda: pd.Series(self._school_column('District_ID', schools), dtype=str),
+            'Block_ID': lambda: pd.Series(self._school_column('Block_ID', schools), dtype=str),
+            'School_ID': lambda: pd.Series(self._school_column('School_ID', schools), dtype=str),
+            'Grade': lambda: pd.Series(self.grade[rows]).astype(str),
+            'student_no': lambda: (
+                pd.Series(self.sequence[rows]).astype(str).str.zfill(self.student_digits).str[-self.student_digits:]
+                .where(self.sequence[rows] > 0, '')
+            )
+        }
+        custom_ids = pd.Series([''] * len(rows), dtype=str)
+        for param in parameter_mapping[self.selected_param].split(','):
+            custom_ids = custom_ids + parts[param]()
+        return custom_ids.to_numpy()
+
+    def mapped_frame(self, rows=None):
+        # The data_mapped columns of process_data for these rows
+        import numpy as np
+        import pandas as pd
+
+        rows = self._rows(rows)
+        schools = self.school_index[rows]
+        frame = pd.DataFrame({'Roll_Number': self.custom_ids(rows)})
+        if self.passcodes is not None:
+            frame['PASSCODE'] = self.passcodes[rows].astype(str)
+        frame['Grade'] = self.grade[rows].astype(np.int64)
+        frame['School Name'] = self._school_column('School', schools)
+        frame['School Code'] = self._school_column('School_ID', schools)
+        frame['District Name'] = self._school_column('District', schools)
+        frame['Block Name'] = self._school_column('Block', schools)
+        frame['Gender'] = np.where(self.gender[rows] == 0, 'Male', 'Female')
+        return frame
+
+    def expanded_frame(self, rows=None):
+        # The data_expanded rows of process_data, with PASSCODE after Custom_ID as add_passcodes puts it
+        import pandas as pd
+
+        if self.inputs is None:
+            raise ValueError("The Student_Ids export needs a roster built with from_excel")
+        rows = self._rows(rows)
+        numbered = self.sequence[rows] > 0
+        frame = self.inputs.iloc[self.school_index[rows]].reset_index(drop=True)
+        frame['Student_IDs'] = pd.Series(self.student_ids(rows), dtype=str).where(numbered)
+        frame['student_no'] = pd.Series(self.sequence[rows]).astype(str).str.zfill(self.student_digits).str[-self.student_digits:].where(numbered)
+        frame['Custom_ID'] = self.custom_ids(rows)
+        if self.passcodes is not None:
+            frame['PASSCODE'] = self.passcodes[rows].astype(str)
+        return frame
+
+    def _chunks(self, chunk_rows):
+        # At least one, possibly empty, chunk so exports always get their header row
+        for start in range(0, max(len(self), 1), chunk_rows):
+            yield slice(start, start + chunk_rows)
+
+    def iter_expanded_frames(self, chunk_rows=100000):
+        for rows in self._chunks(chunk_rows):
+            yield self.expanded_frame(rows)
+
+    def iter_mapped_frames(self, chunk_rows=100000):
+        # Export in bounded chunks so the formatted strings never exist for every student at once
+        for rows in self._chunks(chunk_rows):
+            yield self.mapped_frame(rows)
+
+    def iter_column(self, column, chunk_rows=100000):
+        # STUDENT ID or PASSCODE values as on the sheets, a chunk at a time, for measuring them
+        import pandas as pd
+
+        for rows in self._chunks(chunk_rows):
+            rows = self._rows(rows)
+            if column == 'STUDENT ID':
+                yield pd.Series(self.custom_ids(rows), dtype=str)
+            elif column == 'PASSCODE' and self.passcodes is not None:
+                yield pd.Series(self.passcodes[rows].astype(str), dtype=str)
+
+    def rows_per_school(self):
+        # Rows per formatted School_ID, as data_expanded.groupby('School_ID').size()
+        import pandas as pd
+
+        rows = pd.Series(self.offsets[1:] - self.offsets[:-1], index=pd.Index(self.schools['School_ID'], name='School_ID'))
+        return rows.groupby(level=0).sum()
+
+    def custom_id_lengths(self, chunk_rows=100000):
+        # Custom_ID length counts, as data_expanded['Custom_ID'].str.len().value_counts()
+        import pandas as pd
+
+        counts = None
+        for frame in self.iter_column('STUDENT ID', chunk_rows):
+            chunk = frame.str.len().value_counts()
+            counts = chunk if counts is None else counts.add(chunk, fill_value=0)
+        return counts.astype('int64').sort_index()
+
+    def attendance_records(self):
+        # Same records as sheets.group_attendance_records, grouped over schools instead of students
+        import numpy as np
+        import pandas as pd
+
+        schools = pd.DataFrame({
+            'School Code': self.schools['School_ID'],
+            'SCHOOL NAME': self.schools['School'],
+            'DISTRICT': self.schools['District'],
+            'BLOCK': self.schools['Block'],
+            'CLASS': self.class_grade,
+            'school': np.arange(len(self.schools))
+        })
+        grouping_columns = [col for col in schools.columns if col != 'school' and schools[col].notna().any()]
+        grouped = schools.groupby(grouping_columns)['school'].agg(list).reset_index()
+
+        def student_count(group_schools):
+            # Distinct IDs, as the frame path counts them: a school listed twice in the upload
+            # shares its School_ID and so repeats its IDs, as do sequence numbers past student_digits
+            rows = np.concatenate([np.arange(self.offsets[school], self.offsets[school + 1]) for school in group_schools])
+            if len(group_schools) == 1 and len(rows) <= 10 ** self.student_digits:
+                return len(rows)
+            return len(set(self.custom_ids(rows)))
+
+        grouped['student_count'] = grouped.pop('school').map(student_count)
+        return grouped.to_dict(orient='records')
+
+    def students(self, record):
+        # Student IDs and passcodes of one school code, formatted on demand for rendering
+        import numpy as np
+
+        if self._schools_by_code is None:
+            self._schools_by_code = {}
+            for school, code in enumerate(self.schools['School_ID']):
+                self._schools_by_code.setdefault(code, []).append(school)
+
+        schools = self._schools_by_code.get(record.get('School Code', ''), [])
+        rows = np.concatenate([np.arange(self.offsets[school], self.offsets[school + 1]) for school in schools]) if schools else np.arange(0)
+        passcodes = self.passcodes[rows].astype(str).tolist() if self.passcodes is not None else []
+        return self.custom_ids(rows).tolist(), passcodes
@@ -0,0 +1,76 @@
+# Streamlit widgets shared by the attendance apps: layout and roster options, and the jobs that
+# queue archive renders on the shared scheduler and offer the results
+import uuid
+
+import streamlit as st
+
+from pdfcreator import archive, checkpoint, sheets
+from pdfcreator.scheduler import QueueFull, follow_job, get_scheduler
+
+roster_labels = {
+    None: "No rosters",
+    'workbook': "One Excel roster per school",
+    'sheet': "One Excel workbook, a sheet per school"
+}
+
+def roster_option():
+    # Editable Excel rosters to package next to the PDFs
+    return st.selectbox("Excel rosters", list(roster_labels), format_func=roster_labels.get)
+
+def layout_options(df):
+    # Fit column widths and font sizes to the longest IDs and names in the batch
+    autofit = st.checkbox("Auto-fit columns to content", value=True)
+    barcodes = st.checkbox("Print student ID barcodes", value=False)
+    narrow_barcodes = sheets.narrow_barcode_count(df) if barcodes and not autofit else 0
+    if narrow_barcodes:
+        # Without auto-fit the STUDENT ID column keeps its default width
+        st.warning(f"{narrow_barcodes} student IDs are too long for barcodes that scan reliably at the default column width. Turn on auto-fit to widen the column.")
+    return autofit, barcodes
+
+def submit_archive_job(df, result, image, mode='single', max_volume_bytes=None, resumable=False, **options):
+    # Each browser session is one user for queue fairness
+    user = st.session_state.setdefault('render_user', uuid.uuid4().hex)
+    try:
+        if resumable:
+            # Checkpointed in a durable job directory; rerunning the same input resumes it
+            job = get_scheduler().submit(user, checkpoint.render_resumable_archive, df, result, image, **options)
+        else:
+            job = get_scheduler().submit(user, archive.render_archives, df, result, image, mode, max_volume_bytes, **options)
+    except QueueFull as error:
+        st.error(f"{error}. Please try again in a few minutes.")
+        return None
+
+    st.session_state['render_job'] = job
+    st.session_state['render_mode'] = mode
+    return job
+
+def show_archive_job():
+    job = st.session_state.get('render_job')
+    if job is None:
+        return
+
+    def offer_archive(shard):
+        label = "Click to Download Zip File" if shard['name'] == 'attendance_Sheets' else f"Download {shard['file_name']} ({shard['school_count']} schools)"
+        st.download_button(
+            label=label,
+            data=shard['data'],
+            file_name=shard['file_name'],
+            mime="application/zip",
+            key=f"archive_{job.id}_{shard['name']}"
+        )
+
+    try:
+        shards = follow_job(job, st.empty(), on_output=offer_archive)
+    except Exception as error:
+        st.error(f"Rendering failed: {error}")
+        return
+
+    mode = st.session_state.get('render_mode', 'single')
+    if mode != 'single':
+        st.download_button(
+            label="Download Manifest",
+            data=archive.build_manifest(shards, mode),
+            file_name="attendance_Sheets_manifest.json",
+            mime="application/json",
+            key=f"manifest_{job.id}"
+        )
@@ -0,0 +1,134 @@
+# Unicode TrueType fonts for regional-language names.
+# fpdf's add_font(uni=True) parses the whole TTF for every document, and its _putfonts
+# subsets the font again for every document. Here the parsed metrics are kept once per
+# process, and the embedded subset is built once per glyph set (see font_subset).
+import functools
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import zlib
+
+# Name of the font family registered on each document
+unicode_font_family = 'regional'
+
+# Default font file, e.g. a TTF covering Devanagari, Odia and Telugu
+unicode_font_env = 'PDFCREATOR_UNICODE_FONT'
+
+_font_metrics = {}
+_font_metrics_lock = threading.Lock()
+
+def default_font_path():
+    return os.environ.get(unicode_font_env) or None
+
+def store_uploaded_font(font_bytes):
+    # Save uploads under their content hash so every session reuses the same parsed metrics
+    font_dir = os.path.join(tempfile.gettempdir(), 'pdfcreator_fonts')
+    os.makedirs(font_dir, exist_ok=True)
+    font_path = os.path.join(font_dir, hashlib.sha256(font_bytes).hexdigest() + '.ttf')
+    if not os.path.exists(font_path):
+        with tempfile.NamedTemporaryFile(dir=font_dir, delete=False) as tmp_font_file:
+            tmp_font_file.write(font_bytes)
+        os.replace(tmp_font_file.name, font_path)
+    return font_path
+
+def font_metrics(ttf_path):
+    ttf_path = os.path.abspath(ttf_path)
+    with _font_metrics_lock:
+        metrics = _font_metrics.get(ttf_path)
+        if metrics is not None:
+            return metrics
+
+        from fpdf.ttfonts import TTFontFile
+
+        ttf = TTFontFile()
+        ttf.getMetrics(ttf_path)
+        metrics = {
+            'name': re.sub('[ ()]', '', ttf.fullName),
+            'type': 'TTF',
+            'desc': {
+                'Ascent': int(round(ttf.ascent, 0)),
+                'Descent': int(round(ttf.descent, 0)),
+                'CapHeight': int(round(ttf.capHeight, 0)),
+                'Flags': ttf.flags,
+                'FontBBox': "[%s %s %s %s]" % tuple(int(round(value, 0)) for value in ttf.bbox),
+                'ItalicAngle': int(ttf.italicAngle),
+                'StemV': int(round(ttf.stemV, 0)),
+                'MissingWidth': int(round(ttf.defaultWidth, 0))
+            },
+            'up': round(ttf.underlinePosition),
+            'ut': round(ttf.underlineThickness),
+            'cw': ttf.charWidths,
+            'ttffile': ttf_path,
+            'originalsize': os.stat(ttf_path).st_size
+        }
+        _font_metrics[ttf_path] = metrics
+        return metrics
+
+def add_unicode_font(pdf, ttf_path, family=unicode_font_family, style=''):
+    # Register the cached metrics on this document; the subset list is per document
+    fontkey = family.lower() + style.upper()
+    if fontkey in pdf.fonts:
+        return fontkey
+
+    metrics = font_metrics(ttf_path)
+    pdf.fonts[fontkey] = {
+        'i': len(pdf.fonts) + 1,
+        'type': metrics['type'],
+        'name': metrics['name'],
+        'desc': metrics['desc'],
+        'up': metrics['up'],
+        'ut': metrics['ut'],
+        'cw': metrics['cw'],
+        'ttffile': metrics['ttffile'],
+        'fontkey': fontkey,
+        'subset': list(range(0, 32)),
+        'unifilename': None
+    }
+    pdf.font_files[fontkey] = {'length1': metrics['originalsize'], 'type': 'TTF', 'ttffile': metrics['ttffile']}
+    pdf.font_files[metrics['ttffile']] = {'type': 'TTF'}
+    return fontkey
+
+# Code points per block; a document embeds every block it touches, not only its own characters
+glyph_block_size = 128
+
+def glyph_set(codes):
+    # Widen the characters a document used to whole blocks, so every school of a region
+    # embeds the same glyph set and font_subset builds it once. Code 0 is never embedded
+    blocks = {code // glyph_block_size for code in codes}
+    return frozenset(
+        code for block in blocks
+        for code in range(block * glyph_block_size, (block + 1) * glyph_block_size)
+    ) - {0}
+
+class _WidthsWriter:
+    # Collects what fpdf's _putTTfontwidths writes, without a document
+    def __init__(self):
+        self.lines = []
+
+    def _out(self, line):
+        self.lines.append(line)
+
+@functools.lru_cache(maxsize=32)
+def font_subset(ttf_path, codes):
+    # Embedded font stream, /W widths and CIDToGIDMap of one glyph set, as fpdf 1.7's _putfonts builds them
+    from fpdf import FPDF
+    from fpdf.ttfonts import TTFontFile
+
+    ttf = TTFontFile()
+    font_stream = ttf.makeSubset(ttf_path, sorted(codes))
+
+    cid_to_gid = bytearray(256 * 256 * 2)
+    for code, glyph in ttf.codeToGlyph.items():
+        cid_to_gid[code * 2] = glyph >> 8
+        cid_to_gid[code * 2 + 1] = glyph & 0xFF
+
+    widths = _WidthsWriter()
+    FPDF._putTTfontwidths(widths, {'cw': font_metrics(ttf_path)['cw'], 'subset': codes, 'unifilename': None}, ttf.maxUni)
+    return {
+        'stream': zlib.compress(font_stream),
+        'size': len(font_stream),
+        'widths': '\n'.join(widths.lines),
+        'cid_to_gid': zlib.compress(bytes(cid_to_gid))
+    }
@@ -0,0 +1,159 @@
+# Student ID generation; pandas and numpy are imported on first use to keep app start-up light
+
+# Define the parameter descriptions
+parameter_descriptions = {
+    'A1': "Block_ID, Grade, student_no: Uses Block_ID, Grade, and student_no to generate the ID.",
+    'A2': "School_ID, Grade, student_no: Uses School_ID, Grade, and student_no to generate the ID.",
+    'A3': "District_ID, School_ID, Grade, student_no: Uses District_ID, School_ID, Grade, and student_no to generate the ID.",
+    'A4': "District_ID, Grade, student_no: Uses District_ID, Grade, and student_no to generate the ID.",
+    'A5': "Partner_ID, Grade, student_no: Uses Partner_ID, Grade, and student_no to generate the ID.",
+    'A6': "District_ID, Block_ID, Grade, student_no: Uses District_ID, Block_ID, Grade, and student_no to generate the ID.",
+    'A7': "Block_ID, School_ID, Grade, student_no: Uses Block_ID, School_ID, Grade, and student_no to generate the ID.",
+    'A8': "Partner_ID, Block_ID, Grade, student_no: Uses Partner_ID, Block_ID, Grade, and student_no to generate the ID.",
+    'A9': "Partner_ID, District_ID, Grade, student_no: Uses Partner_ID, District_ID, Grade, and student_no to generate the ID.",
+    'A10': "Partner_ID, School_ID, Grade, student_no: Uses Partner_ID, School_ID, Grade, and student_no to generate the ID."
+}
+
+# Define the mapping for parameter sets
+parameter_mapping = {
+    'A1': "Block_ID,Grade,student_no",
+    'A2': "School_ID,Grade,student_no",
+    'A3': "District_ID,School_ID,Grade,student_no",
+    'A4': "District_ID,Grade,student_no",
+    'A5': "Partner_ID,Grade,student_no",
+    'A6': "District_ID,Block_ID,Grade,student_no",
+    'A7': "Block_ID,School_ID,Grade,student_no",
+    'A8': "Partner_ID,Block_ID,Grade,student_no",
+    'A9': "Partner_ID,District_ID,Grade,student_no",
+    'A10': "Partner_ID,School_ID,Grade,student_no"
+}
+
+def generate_custom_id(row, params):
+    import pandas as pd
+
+    params_split = params.split(',')
+    custom_id = []
+    for param in params_split:
+        if param in row and pd.notna(row[param]):
+            value = row[param]
+            if isinstance(value, float) and value % 1 == 0:
+                value = int(value)
+            custom_id.append(str(value))
+    return ''.join(custom_id)
+
+def process_data(uploaded_file, partner_id, buffer_percent, grade, district_digits, block_digits, school_digits, student_digits, selected_param):
+    import numpy as np
+    import pandas as pd
+
+    data = pd.read_excel(uploaded_file)
+
+    # Assign the Partner_ID directly
+    data['Partner_ID'] = str(partner_id).zfill(len(str(partner_id)))  # Padding Partner_ID
+    data['Grade'] = grade
+
+    # Assign unique IDs for District, Block, and School, default to "00" for missing values
+    data['District_ID'] = data['District'].apply(lambda x: str(data['District'].unique().tolist().index(x) + 1).zfill(district_digits) if x != "NA" else "0".zfill(district_digits))
+    data['Block_ID'] = data['Block'].apply(lambda x: str(data['Block'].unique().tolist().index(x) + 1).zfill(block_digits) if x != "NA" else "0".zfill(block_digits))
+    data['School_ID'] = data['School_ID'].apply(lambda x: str(data['School_ID'].unique().tolist().index(x) + 1).zfill(school_digits) if x != "NA" else "0".zfill(school_digits))
+
+    # Calculate Total Students With Buffer based on the provided buffer percentage
+    data['Total_Students_With_Buffer'] = np.floor(data['Total_Students'] * (1 + buffer_percent / 100))
+
+    # Generate student IDs based on the calculated Total Students With Buffer
+    def generate_student_ids(row):
+        if pd.notna(row['Total_Students_With_Buffer']) and row['Total_Students_With_Buffer'] > 0:
+            student_ids = [
+                f"{row['School_ID']}{str(int(row['Grade'])).zfill(2)}{str(i).zfill(student_digits)}"
+                for i in range(1, int(row['Total_Students_With_Buffer']) + 1)
+            ]
+            return student_ids
+        return []
+
+    data['Student_IDs'] = data.apply(generate_student_ids, axis=1)
+
+    # Expand the data frame to have one row per student ID
+    data_expanded = data.explode('Student_IDs')
+
+    # Extract student number from the ID
+    data_expanded['student_no'] = data_expanded['Student_IDs'].str[-student_digits:]
+
+    # Use the selected parameter set for generating Custom_ID
+    data_expanded['Custom_ID'] = data_expanded.apply(lambda row: generate_custom_id(row, parameter_mapping[selected_param]), axis=1)
+
+    # Generate the additional Excel sheet with mapped columns
+    data_mapped = data_expanded[['Custom_ID', 'Grade', 'School', 'School_ID', 'District', 'Block']].copy()
+    data_mapped.columns = ['Roll_Number', 'Grade', 'School Name', 'School Code', 'District Name', 'Block Name']
+    data_mapped['Gender'] = np.random.choice(['Male', 'Female'], size=len(data_mapped), replace=True)
+
+    return data_expanded, data_mapped
+
+def to_excel_bytes(frame):
+    import io
+    import pandas as pd
+
+    towrite = io.BytesIO()
+    with pd.ExcelWriter(towrite, engine='xlsxwriter') as writer:
+        frame.to_excel(writer, index=False)
+    return towrite.getvalue()
+
+def write_frames_excel(frames, output):
+    # One sheet written a chunk at a time to output (a path or binary file), with to_excel_bytes'
+    # header and blank cells for missing values. Rows are flushed as they are written (xlsxwriter's
+    # constant_memory needs them in order, which pandas' column-by-column writer does not keep),
+    # so only the current chunk is held in memory
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+    worksheet = workbook.add_worksheet('Sheet1')
+    header_format = workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+    row = 0
+    for frame in frames:
+        if row == 0:
+            worksheet.write_row(0, 0, [str(col) for col in frame.columns], header_format)
+            row = 1
+        for values in frame.astype(object).where(frame.notna(), None).to_numpy().tolist():
+            worksheet.write_row(row, 0, values)
+            row += 1
+    workbook.close()
+
+def frames_to_excel_bytes(frames):
+    import io
+
+    towrite = io.BytesIO()
+    write_frames_excel(frames, towrite)
+    return towrite.getvalue()
+
+def parquet_available():
+    import importlib.util
+
+    return any(importlib.util.find_spec(engine) is not None for engine in ('pyarrow', 'fastparquet'))
+
+def to_parquet_bytes(frame):
+    import io
+
+    towrite = io.BytesIO()
+    frame.to_parquet(towrite, index=False)
+    return towrite.getvalue()
+
+def frames_to_parquet_bytes(frames):
+    # Row group per chunk with pyarrow; fastparquet only writes whole frames
+    import importlib.util
+    import io
+
+    if importlib.util.find_spec('pyarrow') is None:
+        import pandas as pd
+
+        return to_parquet_bytes(pd.concat(frames, ignore_index=True))
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    towrite = io.BytesIO()
+    writer = None
+    for frame in frames:
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(towrite, table.schema)
+        writer.write_table(table)
+    writer.close()
+    return towrite.getvalue()
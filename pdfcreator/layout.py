@@ -0,0 +1,103 @@
+# Content-aware column auto-fit for the attendance sheets.
+# Text is measured from the font metrics without a PDF instance; each distinct
+# (font, size, string) is measured once, and the layout is computed once per batch.
+import functools
+
+from pdfcreator import fonts, sheets
+from pdfcreator.barcode import barcode_width
+
+points_per_mm = 72 / 25.4
+cell_padding = 2 * 28.35 / points_per_mm / 10  # fpdf's left and right cell margin in mm
+
+# Page width and margins (A4 with 10 mm side margins)
+available_width = 210 - 10 - 10
+
+# Column that gives up width first when another column needs more room
+elastic_column = 'STUDENT NAME'
+min_elastic_width = 20
+
+# Default and smallest font sizes in points
+header_font_size = 5.5
+row_font_size = 7
+info_font_size = 6
+min_font_size = 4
+
+@functools.lru_cache(maxsize=None)
+def _char_widths(font_key):
+    # font_key is a core font key such as 'helveticaB', or a TTF path
+    if font_key.lower().endswith('.ttf'):
+        return fonts.font_metrics(font_key)['cw']
+
+    from fpdf.fonts import fpdf_charwidths
+
+    return fpdf_charwidths[font_key]
+
+@functools.lru_cache(maxsize=262144)
+def text_width(font_key, size, text):
+    # Width of text in mm, matching fpdf's get_string_width
+    char_widths = _char_widths(font_key)
+    if isinstance(char_widths, dict):
+        units = sum(char_widths.get(char, 0) for char in text)
+    else:
+        missing_width = fonts.font_metrics(font_key)['desc']['MissingWidth'] or 500
+        units = sum(char_widths[ord(char)] if ord(char) < len(char_widths) else missing_width for char in text)
+    return units * size / 1000 / points_per_mm
+
+def widest(font_key, size, texts):
+    return max((text_width(font_key, size, str(text)) for text in set(texts)), default=0)
+
+def fit_font_size(font_key, size, texts, width):
+    # Largest size not above the default at which every text fits in width
+    return shrink_to_fit(size, widest(font_key, size, texts), width)
+
+def shrink_to_fit(size, text_width, width):
+    # As fit_font_size, for texts already measured at size
+    needed = text_width + cell_padding
+    if needed <= width:
+        return size
+    return max(min_font_size, size * (width - cell_padding) / (needed - cell_padding))
+
+def autofit_layout(df, result, column_widths, column_names, font_path=None, barcodes=False):
+    # Start from the hard-coded widths scaled to the page, as create_attendance_pdf does
+    total_column_width = sum(column_widths[col] for col in column_names)
+    scaling_factor = min(1, available_width / total_column_width)
+    widths = {col: column_widths[col] * scaling_factor for col in column_names}
+
+    # Measure the STUDENT ID and PASSCODE columns; a compact roster is read a chunk at a time
+    text_widths = {}
+    needed_widths = {}
+    for col in ('STUDENT ID', 'PASSCODE'):
+        for values in sheets.student_column_chunks(df, col):
+            values = (values.fillna('') if col == 'PASSCODE' else values).astype(str).unique()
+            text_widths[col] = max(text_widths.get(col, 0), widest('helvetica', row_font_size, values))
+            needed_widths[col] = max(needed_widths.get(col, 0), text_widths[col] + cell_padding)
+            if barcodes and col == 'STUDENT ID':
+                needed_widths[col] = max([needed_widths[col]] + [barcode_width(student_id) for student_id in values])
+
+    # Widen them to their longest values, taking room from the elastic column
+    for col, needed_width in needed_widths.items():
+        if col in widths and needed_width > widths[col] and elastic_column in widths:
+            spare = max(0, widths[elastic_column] - min_elastic_width)
+            extra = min(spare, needed_width - widths[col])
+            widths[col] += extra
+            widths[elastic_column] -= extra
+
+    # Shrink fonts for whatever still does not fit
+    layout = {
+        'column_widths': widths,
+        'row_font_size': min(
+            [row_font_size] + [shrink_to_fit(row_font_size, text_width, widths.get(col, 0)) for col, text_width in text_widths.items()]
+        ),
+        'header_font_size': min(fit_font_size('helveticaB', header_font_size, [col], widths[col]) for col in column_names)
+    }
+
+    info_font_key = font_path or 'helveticaB'
+    merged_cell_width = sum(widths.values())
+    info_lines = [
+        f"{label}: {value}"
+        for record in result
+        for label, value in sheets.match_info_labels(record).items()
+        if label != 'DISTRICT'  # the DISTRICT line is padded out to the assessment date
+    ]
+    layout['info_font_size'] = fit_font_size(info_font_key, info_font_size, info_lines, merged_cell_width)
+    return layout
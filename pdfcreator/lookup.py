@@ -0,0 +1,79 @@
+# School lookup and cached single-school renders for the one-school-at-a-time apps.
+# Records are indexed once by code and by name, so picking one of 60k schools is a dict
+# hit, and popular schools are served from a process-wide cache of rendered PDFs.
+import bisect
+import hashlib
+
+from pdfcreator import sheets
+from pdfcreator.cache import BytesLRUCache
+
+# Rendered single-school PDFs keyed by input data, logo, school and render options
+school_pdf_cache = BytesLRUCache(max_entries=256, max_bytes=128 * 1024 * 1024)
+
+class SchoolIndex:
+    def __init__(self, result):
+        self.records = result
+        self.by_code = {}  # lower-case school code -> first record position
+        search_keys = []
+        for position, record in enumerate(result):
+            code = str(record.get('School Code', '')).lower()
+            self.by_code.setdefault(code, position)
+            search_keys.append((code, position))
+            search_keys.append((str(record.get('SCHOOL NAME', '')).lower(), position))
+        # Sorted once so prefix searches are a binary search instead of a scan
+        search_keys.sort()
+        self._keys = [key for key, _ in search_keys]
+        self._positions = [position for _, position in search_keys]
+
+    def __len__(self):
+        return len(self.records)
+
+    def get(self, code):
+        position = self.by_code.get(str(code).lower())
+        return self.records[position] if position is not None else None
+
+    def search(self, query, limit=100):
+        # Positions of records whose name or code starts with query, then those containing it
+        query = query.strip().lower()
+        if not query:
+            return list(range(min(limit, len(self.records))))
+
+        # An exact school code comes first
+        matches = {}
+        exact = self.by_code.get(query)
+        if exact is not None:
+            matches[exact] = None
+
+        start = bisect.bisect_left(self._keys, query)
+        for key, position in zip(self._keys[start:], self._positions[start:]):
+            if not key.startswith(query) or len(matches) >= limit:
+                break
+            matches.setdefault(position, None)
+
+        if len(matches) < limit:
+            for key, position in zip(self._keys, self._positions):
+                if query in key:
+                    matches.setdefault(position, None)
+                    if len(matches) >= limit:
+                        break
+        return list(matches)
+
+    def label(self, position):
+        record = self.records[position]
+        return f"{record.get('SCHOOL NAME', 'default_code')} ({record.get('School Code', '')})"
+
+def render_cached_school_pdf(df, record, image_bytes, data_key, font_path=None, autofit=False, barcodes=False):
+    # data_key identifies the uploaded roster, e.g. a hash of the Excel file
+    key = (
+        data_key, hashlib.sha256(image_bytes).hexdigest(), str(record.get('School Code', '')),
+        record.get('CLASS'), font_path, autofit, barcodes
+    )
+    cached = school_pdf_cache.get(key)
+    if cached is not None:
+        return cached
+
+    layout = sheets.batch_layout(df, [record], font_path, barcodes) if autofit else None
+    with sheets.temporary_image(image_bytes) as image_path:
+        pdf_data = sheets.render_school_pdf(df, record, image_path, font_path=font_path, layout=layout, barcodes=barcodes)
+    school_pdf_cache.put(key, pdf_data)
+    return pdf_data
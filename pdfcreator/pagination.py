@@ -0,0 +1,171 @@
+# Page planning for the attendance sheets. Rows per page are computed from the page geometry
+# before anything is drawn, so every page repeats the table header, large schools are cut
+# into page ranges that render in parallel, and the biggest schools are started first.
+from collections import deque
+
+from pdfcreator import sheets
+
+# A4 page geometry in mm, as laid out by sheets.new_attendance_pdf
+page_height = 297
+top_margin = 10  # fpdf's default top margin
+bottom_margin = 20  # fpdf's default auto page break margin
+title_block_height = 10 + 10 + 30  # title, subtitle and the school information cell
+
+def rows_per_page(with_title):
+    top = top_margin + (title_block_height if with_title else 0) + sheets.table_cell_height
+    return int((page_height - bottom_margin - top) // sheets.table_cell_height)
+
+first_page_rows = rows_per_page(True)
+continuation_page_rows = rows_per_page(False)
+
+# Pages rendered by one task; fixed so the output does not depend on the worker count
+pages_per_task = 8
+
+# Schools written, planned and submitted together, largest first. At most two windows are
+# in flight, which bounds the formatted IDs and the PDFs held in memory
+schools_per_window = 256
+
+def plan_pages(student_count):
+    # (start, end) row range of each page; a school without students still gets its title page
+    pages = [(0, min(student_count, first_page_rows))]
+    while pages[-1][1] < student_count:
+        start = pages[-1][1]
+        pages.append((start, min(student_count, start + continuation_page_rows)))
+    return pages
+
+def page_count(student_count):
+    if student_count <= first_page_rows:
+        return 1
+    return 1 + -(-(student_count - first_page_rows) // continuation_page_rows)
+
+def task_ranges(student_count):
+    # (first, last) page indexes of each task of one school
+    total = page_count(student_count)
+    return [(first, min(total, first + pages_per_task)) for first in range(0, total, pages_per_task)]
+
+def render_pages(record, pages, student_ids, passcodes, options):
+    # Draw one task's pages; student_ids and passcodes hold only those pages' rows.
+    # The first task of a school returns its document, the others only their page content
+    pdf = sheets.new_attendance_pdf(options['deterministic'])
+    sheets.register_fonts(pdf, options['font_path'])
+    sheets.draw_attendance_pages(
+        pdf, sheets.column_widths, sheets.column_names, options['image_path'], record,
+        student_ids, passcodes, pages,
+        font_path=options['font_path'], layout=options['layout'], barcodes=options['barcodes']
+    )
+    if pages[0][0] == 0:
+        return pdf
+    return [pdf.pages[n] for n in range(1, pdf.page + 1)]
+
+def merge_school(parts, stream=None):
+    # Continuation pages only use the core fonts, registered under the same indexes in every part.
+    # With a stream, finished pages are written out as the later parts arrive
+    from pdfcreator.pdf import StreamingUnsupported
+
+    parts = iter(parts)
+    pdf = next(parts)
+    streaming = stream is not None
+    if streaming:
+        try:
+            pdf.start_stream(stream)
+        except StreamingUnsupported:
+            # Not fpdf 1.7, or the document needs every page at the end: merge in memory
+            streaming = False
+    for contents in parts:
+        for content in contents:
+            pdf.add_page()
+            pdf.pages[pdf.page] = content
+    if streaming:
+        pdf.close()
+        return pdf.written
+    data = sheets.pdf_bytes(pdf)
+    if stream is not None:
+        stream.write(data)
+        return len(data)
+    return data
+
+def student_positions(df, result=None):
+    if hasattr(df, 'students'):
+        # A compact.CompactRoster formats each school's IDs only when the school is rendered
+        return df.students
+    if result is not None and len(result) == 1:
+        # A single school: one boolean mask is far cheaper than grouping the whole frame
+        return lambda record: sheets.school_students(df, record)
+
+    # Row positions of each school code, computed once per batch instead of filtering df per school
+    student_ids = df['STUDENT ID'].to_numpy()
+    passcodes = df['PASSCODE'].fillna('').to_numpy() if 'PASSCODE' in df.columns else None
+    positions = df.groupby('School Code', sort=False).indices
+
+    def students(record):
+        rows = positions.get(record.get('School Code', ''), [])
+        return student_ids[rows].tolist(), passcodes[rows].tolist() if passcodes is not None else []
+
+    return students
+
+def iter_school_parts(df, result, image_path, font_path=None, layout=None, barcodes=False, deterministic=False, parallel=True):
+    # For each school in the order of result, an iterator over its rendered parts for merge_school;
+    # consume each school's parts before moving on to the next school. Parallel runs go to the
+    # scheduler's shared render pool, or stay in this thread when it has a single process
+    from pdfcreator.scheduler import get_render_pool
+
+    options = {'image_path': image_path, 'font_path': font_path, 'layout': layout, 'barcodes': barcodes, 'deterministic': deterministic}
+    students = student_positions(df, result)
+    executor = get_render_pool() if parallel else None
+
+    if executor is None:
+        def local_parts(record):
+            student_ids, passcodes = students(record)
+            pages = plan_pages(record.get('student_count', 0))
+            for first, last in task_ranges(record.get('student_count', 0)):
+                start, end = pages[first][0], pages[last - 1][1]
+                yield render_pages(record, pages[first:last], student_ids[start:end], passcodes[start:end], options)
+
+        for record in result:
+            yield local_parts(record)
+        return
+
+    from pdfcreator import shared
+
+    # Render processes map each window's student arrays once; a task is a school and a page range
+    with shared.shared_batch(students, options) as batch:
+        def submit_window(window_start):
+            # IDs are formatted and written for this window only, and its tasks queued right away
+            window = range(window_start, min(len(result), window_start + schools_per_window))
+            path = batch.write_window(result[window.start:window.stop])
+            ranges = {school: task_ranges(result[school].get('student_count', 0)) for school in window}
+
+            # Longest schools first so a big school does not finish last on an otherwise idle pool
+            futures = {school: [None] * len(ranges[school]) for school in window}
+            for school in sorted(window, key=lambda school: -ranges[school][-1][1]):
+                for part, (first, last) in enumerate(ranges[school]):
+                    futures[school][part] = executor.submit(shared.render_shared_pages, path, school - window.start, first, last)
+            return path, window, futures
+
+        def finish_window(path, window, futures):
+            for school in window:
+                yield (future.result() for future in futures[school])
+            batch.release(path)
+
+        # The next window is written and queued while this one's schools are merged
+        queued = deque()
+        try:
+            for window_start in range(0, len(result), schools_per_window):
+                queued.append(submit_window(window_start))
+                if len(queued) > 1:
+                    yield from finish_window(*queued[0])
+                    queued.popleft()
+            while queued:
+                yield from finish_window(*queued[0])
+                queued.popleft()
+        finally:
+            # A consumer that stops early leaves no work behind on the shared pool
+            for _, _, futures in queued:
+                for school_futures in futures.values():
+                    for future in school_futures:
+                        future.cancel()
+
+def render_school_pdfs(df, result, image_path, font_path=None, layout=None, barcodes=False, deterministic=False, parallel=True):
+    # Yield each school's PDF bytes in the order of result
+    for parts in iter_school_parts(df, result, image_path, font_path, layout, barcodes, deterministic, parallel):
+        yield merge_school(parts)
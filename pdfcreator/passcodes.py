@@ -0,0 +1,24 @@
+# Student passcodes printed in the PASSCODE column of the attendance sheets.
+# All passcodes for a run come from a single call to the OS random source and are
+# mapped to characters with numpy, so millions of students take well under a second.
+import secrets
+
+# 32 characters without the look-alikes 0/O and 1/I, so each random byte maps without bias
+passcode_alphabet = 'ABCDEFGHJKLMNPQRSTUVWXYZ23456789'
+
+def generate_passcodes(count, length=6):
+    import numpy as np
+
+    alphabet = np.frombuffer(passcode_alphabet.encode('ascii'), dtype=np.uint8)
+    random_bytes = np.frombuffer(secrets.token_bytes(count * length), dtype=np.uint8)
+    characters = alphabet[random_bytes & (len(passcode_alphabet) - 1)]
+    return characters.view(f'S{length}').astype(f'U{length}')
+
+def add_passcodes(data_expanded, data_mapped, length=6):
+    # Both frames come from process_data and share the same row order
+    passcodes = generate_passcodes(len(data_expanded), length)
+    data_expanded = data_expanded.copy()
+    data_expanded.insert(data_expanded.columns.get_loc('Custom_ID') + 1, 'PASSCODE', passcodes)
+    data_mapped = data_mapped.copy()
+    data_mapped.insert(data_mapped.columns.get_loc('Roll_Number') + 1, 'PASSCODE', passcodes)
+    return data_expanded, data_mapped
@@ -0,0 +1,273 @@
+# FPDF document used for all attendance sheets; imported on first render
+import os
+import zlib
+from datetime import datetime, timezone
+
+from fpdf import FPDF
+
+def fixed_creation_date():
+    # Honour SOURCE_DATE_EPOCH like other reproducible builds; otherwise a fixed date
+    epoch = os.environ.get('SOURCE_DATE_EPOCH')
+    if epoch:
+        return datetime.fromtimestamp(int(epoch), tz=timezone.utc)
+    return datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+class StreamingUnsupported(Exception):
+    # start_stream cannot write this document page by page; callers build it in memory instead
+    pass
+
+class AttendancePDF(FPDF):
+    def __init__(self, *args, deterministic=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.deterministic = deterministic
+        if deterministic and hasattr(self, 'set_creation_date'):
+            # fpdf2 exposes the creation date directly
+            self.set_creation_date(fixed_creation_date())
+
+    def _putinfo(self):
+        if not self.deterministic or hasattr(self, 'set_creation_date'):
+            return super()._putinfo()
+
+        # Same entries as fpdf, but with a fixed date so identical input gives identical bytes
+        self._out('/Producer ' + self._textstring('PyFPDF'))
+        for name in ('title', 'subject', 'author', 'keywords', 'creator'):
+            if hasattr(self, name):
+                self._out(f'/{name.capitalize()} ' + self._textstring(getattr(self, name)))
+        self._out('/CreationDate ' + self._textstring('D:' + fixed_creation_date().strftime('%Y%m%d%H%M%S')))
+
+    def _putfonts(self):
+        # As fpdf 1.7's _putfonts for the core and TTF fonts the sheets use, but a TTF subset
+        # is taken from fonts.font_subset instead of being rebuilt for every document
+        if (not hasattr(self, '_putTTfontwidths') or self.diffs
+                or any(font['type'] not in ('core', 'TTF') for font in self.fonts.values())
+                or any(info.get('type', 'TTF') != 'TTF' for info in self.font_files.values())):
+            return super()._putfonts()
+
+        from pdfcreator import fonts
+
+        for _, key, font in sorted((font['i'], key, font) for key, font in self.fonts.items()):
+            self.fonts[key]['n'] = self.n + 1
+            if font['type'] == 'core':
+                self._newobj()
+                self._out('<</Type /Font')
+                self._out('/BaseFont /' + font['name'])
+                self._out('/Subtype /Type1')
+                if font['name'] not in ('Symbol', 'ZapfDingbats'):
+                    self._out('/Encoding /WinAnsiEncoding')
+                self._out('>>')
+                self._out('endobj')
+                continue
+
+            subset = fonts.font_subset(font['ttffile'], fonts.glyph_set(font['subset']))
+            font_name = 'MPDFAA+' + font['name']
+
+            # Type0 font
+            self._newobj()
+            self._out('<</Type /Font')
+            self._out('/Subtype /Type0')
+            self._out('/BaseFont /' + font_name)
+            self._out('/Encoding /Identity-H')
+            self._out('/DescendantFonts [' + str(self.n + 1) + ' 0 R]')
+            self._out('/ToUnicode ' + str(self.n + 2) + ' 0 R')
+            self._out('>>')
+            self._out('endobj')
+
+            # CIDFontType2
+            self._newobj()
+            self._out('<</Type /Font')
+            self._out('/Subtype /CIDFontType2')
+            self._out('/BaseFont /' + font_name)
+            self._out('/CIDSystemInfo ' + str(self.n + 2) + ' 0 R')
+            self._out('/FontDescriptor ' + str(self.n + 3) + ' 0 R')
+            if font['desc'].get('MissingWidth'):
+                self._out('/DW %d' % font['desc']['MissingWidth'])
+            self._out(subset['widths'])
+            self._out('/CIDToGIDMap ' + str(self.n + 4) + ' 0 R')
+            self._out('>>')
+            self._out('endobj')
+
+            # ToUnicode
+            to_unicode = (
+                "/CIDInit /ProcSet findresource begin\n12 dict begin\nbegincmap\n/CIDSystemInfo\n"
+                "<</Registry (Adobe)\n/Ordering (UCS)\n/Supplement 0\n>> def\n"
+                "/CMapName /Adobe-Identity-UCS def\n/CMapType 2 def\n"
+                "1 begincodespacerange\n<0000> <FFFF>\nendcodespacerange\n"
+                "1 beginbfrange\n<0000> <FFFF> <0000>\nendbfrange\n"
+                "endcmap\nCMapName currentdict /CMap defineresource pop\nend\nend"
+            )
+            self._newobj()
+            self._out('<</Length ' + str(len(to_unicode)) + '>>')
+            self._putstream(to_unicode)
+            self._out('endobj')
+
+            # CIDSystemInfo
+            self._newobj()
+            self._out('<</Registry (Adobe)')
+            self._out('/Ordering (UCS)')
+            self._out('/Supplement 0')
+            self._out('>>')
+            self._out('endobj')
+
+            # Font descriptor, without the symbolic flag
+            self._newobj()
+            self._out('<</Type /FontDescriptor')
+            self._out('/FontName /' + font_name)
+            for name in ('Ascent', 'Descent', 'CapHeight', 'Flags', 'FontBBox', 'ItalicAngle', 'StemV', 'MissingWidth'):
+                value = font['desc'][name]
+                if name == 'Flags':
+                    value = (value | 4) & ~32
+                self._out(' /%s %s' % (name, value))
+            self._out('/FontFile2 ' + str(self.n + 2) + ' 0 R')
+            self._out('>>')
+            self._out('endobj')
+
+            # CIDToGIDMap
+            self._newobj()
+            self._out('<</Length ' + str(len(subset['cid_to_gid'])))
+            self._out('/Filter /FlateDecode')
+            self._out('>>')
+            self._putstream(subset['cid_to_gid'])
+            self._out('endobj')
+
+            # Font file
+            self._newobj()
+            self._out('<</Length ' + str(len(subset['stream'])))
+            self._out('/Filter /FlateDecode')
+            self._out('/Length1 ' + str(subset['size']))
+            self._out('>>')
+            self._putstream(subset['stream'])
+            self._out('endobj')
+
+    # Streaming output (fpdf 1.7). After start_stream, each finished page is written to the
+    # stream as its page and content objects and dropped from memory. Pages keep fpdf's
+    # numbering (objects 3 + 2i and 4 + 2i), so the Pages root (1), resources (2) and the
+    # xref are written at close with the offsets of what has already been sent.
+    stream = None
+    written = 0
+
+    def start_stream(self, stream):
+        # Pages already finished are flushed right away; the current page when it ends
+        if not isinstance(getattr(self, 'buffer', None), str):
+            raise StreamingUnsupported("Streaming output needs fpdf 1.7")
+        if hasattr(self, 'str_alias_nb_pages') or self.page_links:
+            raise StreamingUnsupported("Page number aliases and internal links need the whole document")
+        if self.state == 0:
+            self.open()
+        self.stream = stream
+        self.written = 0
+
+        # _out writes to the open page while state is 2; the objects go to the buffer
+        state, self.state = self.state, 1
+        for n in range(1, self.page + (0 if state == 2 else 1)):
+            self._putpage(n)
+        self.state = state
+        self._flush()
+
+    def _flush(self):
+        data = self.buffer.encode('latin-1')
+        self.stream.write(data)
+        self.written += len(data)
+        self.buffer = ''
+
+    def _offset(self):
+        return self.written + len(self.buffer)
+
+    def _newobj(self):
+        if self.stream is None:
+            return super()._newobj()
+        self.n += 1
+        self.offsets[self.n] = self._offset()
+        self._out(str(self.n) + ' 0 obj')
+
+    def _endpage(self):
+        super()._endpage()
+        if self.stream is not None:
+            self._putpage(self.page)
+            self._flush()
+
+    def _putpage(self, n):
+        # Page n and its content stream, as fpdf's _putpages lays them out
+        if self.written == 0 and not self.buffer:
+            # The header goes out with the first page, once an image may have raised pdf_version
+            self._putheader()
+        w_pt, h_pt = (self.fw_pt, self.fh_pt) if self.def_orientation == 'P' else (self.fh_pt, self.fw_pt)
+        self._newobj()
+        self._out('<</Type /Page')
+        self._out('/Parent 1 0 R')
+        if n in self.orientation_changes:
+            self._out('/MediaBox [0 0 %.2f %.2f]' % (h_pt, w_pt))
+        self._out('/Resources 2 0 R')
+        if self.pdf_version > '1.3':
+            self._out('/Group <</Type /Group /S /Transparency /CS /DeviceRGB>>')
+        self._out('/Contents ' + str(self.n + 1) + ' 0 R>>')
+        self._out('endobj')
+
+        content = self.pages[n].encode('latin-1')
+        self.pages[n] = ''  # only the page count is needed from here on
+        if self.compress:
+            content = zlib.compress(content)
+        self._newobj()
+        self._out('<<' + ('/Filter /FlateDecode ' if self.compress else '') + '/Length ' + str(len(content)) + '>>')
+        self._putstream(content)
+        self._out('endobj')
+
+    def _putpages(self):
+        if self.stream is None:
+            return super()._putpages()
+
+        # Every page is already out; only the Pages root is left
+        w_pt, h_pt = (self.fw_pt, self.fh_pt) if self.def_orientation == 'P' else (self.fh_pt, self.fw_pt)
+        self.offsets[1] = self._offset()
+        self._out('1 0 obj')
+        self._out('<</Type /Pages')
+        self._out('/Kids [' + ''.join(f'{3 + 2 * i} 0 R ' for i in range(self.page)) + ']')
+        self._out('/Count ' + str(self.page))
+        self._out('/MediaBox [0 0 %.2f %.2f]' % (w_pt, h_pt))
+        self._out('>>')
+        self._out('endobj')
+
+    def _putresources(self):
+        if self.stream is None:
+            return super()._putresources()
+        self._putfonts()
+        self._putimages()
+        self.offsets[2] = self._offset()
+        self._out('2 0 obj')
+        self._out('<<')
+        self._putresourcedict()
+        self._out('>>')
+        self._out('endobj')
+
+    def _enddoc(self):
+        if self.stream is None:
+            return super()._enddoc()
+
+        # As fpdf's _enddoc, without the header (already sent) and with stream offsets
+        self._putpages()
+        self._putresources()
+        self._newobj()
+        self._out('<<')
+        self._putinfo()
+        self._out('>>')
+        self._out('endobj')
+        self._newobj()
+        self._out('<<')
+        self._putcatalog()
+        self._out('>>')
+        self._out('endobj')
+
+        xref_offset = self._offset()
+        self._out('xref')
+        self._out('0 ' + str(self.n + 1))
+        self._out('0000000000 65535 f ')
+        for i in range(1, self.n + 1):
+            self._out('%010d 00000 n ' % self.offsets[i])
+        self._out('trailer')
+        self._out('<<')
+        self._puttrailer()
+        self._out('>>')
+        self._out('startxref')
+        self._out(xref_offset)
+        self._out('%%EOF')
+        self._flush()
+        self.state = 3
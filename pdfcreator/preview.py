@@ -0,0 +1,30 @@
+# Bounded previews of large generated frames
+import streamlit as st
+
+def preview_rows(total_rows, rows, key, page_size=100):
+    # rows(start, stop) builds only the page being shown; the full data stays on the server
+    page_count = max(1, -(-total_rows // page_size))
+    page = st.number_input(f"Page (1-{page_count})", min_value=1, max_value=page_count, value=1, key=f'{key}_page')
+    start = (page - 1) * page_size
+    st.dataframe(rows(start, start + page_size))
+    st.caption(f"Showing rows {min(start + 1, total_rows)}-{min(start + page_size, total_rows)} of {total_rows}")
+
+def preview_dataframe(df, key, page_size=100):
+    # Send only one page of rows to the browser
+    preview_rows(len(df), lambda start, stop: df.iloc[start:stop], key, page_size)
+
+def show_id_summary(roster):
+    # roster is a compact.CompactRoster; nothing here formats every student's ID at once
+    rows_per_school = roster.rows_per_school()
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Schools", len(rows_per_school))
+    col2.metric("Student IDs", len(roster))
+    col3.metric("Max IDs per School", int(rows_per_school.max()) if len(rows_per_school) else 0)
+
+    st.write("Rows per School:")
+    preview_dataframe(rows_per_school.rename('Rows').reset_index(), key='rows_per_school')
+
+    st.write("Custom ID Length Distribution:")
+    id_lengths = roster.custom_id_lengths()
+    st.dataframe(id_lengths.rename_axis('ID Length').rename('Count').reset_index())
@@ -0,0 +1,144 @@
+# Editable per-school Excel rosters, packaged next to the attendance PDFs.
+# Per-school workbooks are written with xlsxwriter's constant_memory mode (rows are flushed
+# as they are written) on the scheduler's shared render pool, a bounded window at a time, and
+# come back in school order so they can be streamed straight into the archive. The one-sheet-
+# per-school workbook is kept in memory instead: constant_memory holds a temp file open per
+# sheet until the workbook closes, one file descriptor per school.
+import functools
+import io
+import re
+from collections import deque
+from datetime import datetime
+
+
+# 'workbook': one .xlsx per school; 'sheet': one .xlsx with a sheet per school
+roster_modes = ('workbook', 'sheet')
+
+# Header block above the student table, as (label, record key)
+roster_info = [
+    ('SCHOOL NAME', 'SCHOOL NAME'),
+    ('SCHOOL CODE', 'School Code'),
+    ('DISTRICT', 'DISTRICT'),
+    ('BLOCK', 'BLOCK'),
+    ('CLASS', 'CLASS')
+]
+
+roster_columns = ['S.NO', 'STUDENT ID', 'PASSCODE', 'STUDENT NAME', 'GENDER', 'TAB ID']
+
+# Workbooks submitted ahead of the one being written to the archive
+workbooks_in_flight = 64
+
+def roster_tasks(students, result):
+    # students(record) -> (student IDs, passcodes), as from pagination.student_positions.
+    # Plain lists per school so tasks pickle cheaply to the render processes
+    for record in result:
+        student_ids, passcodes = students(record)
+        yield {
+            'record': {key: record.get(key, '') for _, key in roster_info},
+            'student_ids': [str(student_id) for student_id in student_ids],
+            'passcodes': [str(passcode) for passcode in passcodes]
+        }
+
+def sheet_name(record, used_names):
+    # Excel sheet names: at most 31 characters, unique, without []:*?/\
+    base = re.sub(r'[\[\]:*?/\\]', '_', str(record.get('School Code', 'School')))[:31] or 'School'
+    name = base
+    suffix = 1
+    while name.lower() in used_names:
+        suffix += 1
+        name = f"{base[:31 - len(str(suffix)) - 1]}_{suffix}"
+    used_names.add(name.lower())
+    return name
+
+def write_roster_sheet(workbook, worksheet, task, formats):
+    row = 0
+    for label, key in roster_info:
+        worksheet.write(row, 0, label, formats['label'])
+        worksheet.write(row, 1, str(task['record'].get(key, '')))
+        row += 1
+
+    row += 1
+    columns = roster_columns if task['passcodes'] else [col for col in roster_columns if col != 'PASSCODE']
+    worksheet.write_row(row, 0, columns, formats['header'])
+    for i, student_id in enumerate(task['student_ids']):
+        row += 1
+        values = [i + 1, student_id]
+        if task['passcodes']:
+            values.append(task['passcodes'][i])
+        worksheet.write_row(row, 0, values)
+
+    worksheet.set_column(0, 0, 14)
+    worksheet.set_column(1, len(columns) - 1, 18)
+
+def new_roster_workbook(output, deterministic, constant_memory=True):
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': constant_memory})
+    if deterministic:
+        workbook.set_properties({'created': datetime(2000, 1, 1)})
+    formats = {
+        'label': workbook.add_format({'bold': True}),
+        'header': workbook.add_format({'bold': True, 'border': 1, 'align': 'center'})
+    }
+    return workbook, formats
+
+def write_school_workbook(task, deterministic=False):
+    output = io.BytesIO()
+    workbook, formats = new_roster_workbook(output, deterministic)
+    write_roster_sheet(workbook, workbook.add_worksheet('Roster'), task, formats)
+    workbook.close()
+    return output.getvalue()
+
+def write_roster_workbook(df, result, deterministic=False, students=None):
+    # One workbook for a group of schools, one sheet each; written in a single pass.
+    # students is the batch's student_positions lookup when result is part of a larger batch
+    from pdfcreator.pagination import student_positions
+
+    output = io.BytesIO()
+    workbook, formats = new_roster_workbook(output, deterministic, constant_memory=False)
+    used_names = set()
+    for task in roster_tasks(students or student_positions(df, result), result):
+        write_roster_sheet(workbook, workbook.add_worksheet(sheet_name(task['record'], used_names)), task, formats)
+    workbook.close()
+    return output.getvalue()
+
+@functools.lru_cache(maxsize=2)
+def empty_workbook_size(deterministic=False):
+    # Bytes every roster workbook has before its first sheet
+    output = io.BytesIO()
+    workbook, _ = new_roster_workbook(output, deterministic, constant_memory=False)
+    workbook.close()
+    return len(output.getvalue())
+
+def sheet_size(students, record, deterministic=False):
+    # About what one school's sheet adds to a multi-sheet workbook: its own one-sheet workbook
+    # less the parts every workbook has
+    task = next(roster_tasks(students, [record]))
+    return max(0, len(write_school_workbook(task, deterministic)) - empty_workbook_size(deterministic))
+
+def iter_school_workbooks(df, result, deterministic=False, parallel=True):
+    # Yield each school's workbook bytes in the order of result
+    from pdfcreator.pagination import student_positions
+    from pdfcreator.scheduler import get_render_pool
+
+    tasks = roster_tasks(student_positions(df, result), result)
+    executor = get_render_pool() if parallel else None
+    if executor is None:
+        for task in tasks:
+            yield write_school_workbook(task, deterministic)
+        return
+
+    # Only a window of tasks and finished workbooks is held at a time, however many schools there are
+    pending = deque()
+    for task in tasks:
+        pending.append(executor.submit(write_school_workbook, task, deterministic))
+        if len(pending) >= workbooks_in_flight:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def roster_path(pdf_path):
+    # attendance_list_{code}.pdf -> roster_{code}.xlsx in the same folder
+    folder, _, file_name = pdf_path.rpartition('/')
+    file_name = file_name.replace('attendance_list_', 'roster_', 1).rsplit('.', 1)[0] + '.xlsx'
+    return f'{folder}/{file_name}' if folder else file_name
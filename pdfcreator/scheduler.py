@@ -0,0 +1,249 @@
+# Process-wide rendering scheduler shared by every Streamlit session.
+# Jobs wait in a bounded queue and are taken round-robin per user, so one coordinator
+# submitting a state-wide run cannot starve the others. Jobs hand their page-range and
+# workbook tasks to one process pool shared by every job, and the job slots and pool
+# processes are sized together from the CPU count and available memory.
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+# Rough peak memory of one job in the app process (its frames, merged PDFs and archive buffer)
+job_memory_mb = int(os.environ.get('PDFCREATOR_JOB_MEMORY_MB', 512))
+# Rough peak memory of one render process working through a page range or workbook task
+process_memory_mb = int(os.environ.get('PDFCREATOR_PROCESS_MEMORY_MB', 256))
+max_queued_jobs = int(os.environ.get('PDFCREATOR_MAX_QUEUED', 16))
+max_queued_per_user = int(os.environ.get('PDFCREATOR_MAX_QUEUED_PER_USER', 2))
+
+# Imported once by the fork server, so each render process starts with them loaded
+render_preload = ['pdfcreator.shared', 'pdfcreator.rosters', 'fpdf', 'numpy', 'xlsxwriter']
+
+class QueueFull(Exception):
+    pass
+
+def available_memory_mb():
+    # MemAvailable from /proc/meminfo; None where it cannot be read
+    try:
+        with open('/proc/meminfo') as meminfo:
+            for line in meminfo:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    return None
+
+def default_process_count():
+    # Render processes in the shared pool: one per core, within half of the available memory
+    configured = os.environ.get('PDFCREATOR_RENDER_PROCESSES')
+    if configured:
+        return max(1, int(configured))
+
+    processes = os.cpu_count() or 1
+    memory_mb = available_memory_mb()
+    if memory_mb is not None:
+        processes = min(processes, memory_mb // 2 // process_memory_mb)
+    return max(1, processes)
+
+def default_worker_count():
+    # Job slots: one per core, within the memory the render processes leave over
+    configured = os.environ.get('PDFCREATOR_RENDER_WORKERS')
+    if configured:
+        return max(1, int(configured))
+
+    processes = render_process_count()
+    workers = os.cpu_count() or 1
+    memory_mb = available_memory_mb()
+    if memory_mb is not None:
+        pool_memory_mb = processes * process_memory_mb if processes > 1 else 0
+        workers = min(workers, (memory_mb - pool_memory_mb) // job_memory_mb)
+    return max(1, workers)
+
+_render_processes = None
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+def render_process_count():
+    global _render_processes
+    with _render_pool_lock:
+        if _render_processes is None:
+            _render_processes = default_process_count()
+        return _render_processes
+
+def render_context():
+    # The app process runs many threads, so render processes come from a fork server (or are
+    # spawned where there is none) instead of forking it with another thread's locks held
+    import multiprocessing
+
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(render_preload)
+        return context
+    return multiprocessing.get_context('spawn')
+
+def get_render_pool():
+    # The process pool every job submits its render tasks to, started on first use.
+    # None with a single render process: jobs then render in their own thread
+    global _render_pool
+    processes = render_process_count()
+    if processes == 1:
+        return None
+    with _render_pool_lock:
+        # A render process killed by the OS breaks the pool for good; start a new one
+        if _render_pool is None or getattr(_render_pool, '_broken', False):
+            from concurrent.futures import ProcessPoolExecutor
+
+            _render_pool = ProcessPoolExecutor(max_workers=processes, mp_context=render_context())
+        return _render_pool
+
+class RenderJob:
+    _ids = itertools.count(1)
+
+    def __init__(self, scheduler, user, fn, args, kwargs):
+        self.id = next(self._ids)
+        self.user = user
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.state = 'queued'
+        self.outputs = []
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self._scheduler = scheduler
+        self._done = threading.Event()
+
+    def position(self):
+        # 1-based place in the queue, or None once the job has started
+        return self._scheduler.queue_position(self)
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def run(self):
+        self.state = 'running'
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+            if hasattr(result, '__next__'):
+                # Generators publish partial outputs as they are produced
+                for output in result:
+                    self.outputs.append(output)
+                result = self.outputs
+            self.result = result
+            self.state = 'done'
+        except Exception as error:
+            self.error = error
+            self.state = 'failed'
+        finally:
+            self.fn = self.args = self.kwargs = None
+            self._done.set()
+
+class RenderScheduler:
+    def __init__(self, workers=None, max_queued=max_queued_jobs, max_per_user=max_queued_per_user):
+        self.workers = workers or default_worker_count()
+        self.processes = render_process_count()
+        self.max_queued = max_queued
+        self.max_per_user = max_per_user
+        self._queues = OrderedDict()  # user -> deque of jobs, in round-robin order
+        self._queued = 0
+        self._running = 0
+        self._condition = threading.Condition()
+        self._threads = [
+            threading.Thread(target=self._work, name=f'pdfcreator-render-{i}', daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, user, fn, *args, **kwargs):
+        with self._condition:
+            user_queue = self._queues.get(user)
+            if self._queued >= self.max_queued:
+                raise QueueFull(f"The render queue is full ({self.max_queued} jobs waiting)")
+            if user_queue is not None and len(user_queue) >= self.max_per_user:
+                raise QueueFull(f"You already have {self.max_per_user} jobs waiting")
+
+            job = RenderJob(self, user, fn, args, kwargs)
+            if user_queue is None:
+                user_queue = self._queues[user] = deque()
+            user_queue.append(job)
+            self._queued += 1
+            self._condition.notify()
+            return job
+
+    def queue_position(self, job):
+        with self._condition:
+            for position, queued_job in enumerate(self._round_robin_order(), start=1):
+                if queued_job is job:
+                    return position
+        return None
+
+    def stats(self):
+        with self._condition:
+            return {'workers': self.workers, 'processes': self.processes, 'running': self._running, 'queued': self._queued}
+
+    def _round_robin_order(self):
+        # The order in which queued jobs will start, one job per user per round
+        queues = [list(user_queue) for user_queue in self._queues.values()]
+        for round_jobs in itertools.zip_longest(*queues):
+            for job in round_jobs:
+                if job is not None:
+                    yield job
+
+    def _next_job(self):
+        user, user_queue = next(iter(self._queues.items()))
+        job = user_queue.popleft()
+        # Move the user to the back of the rotation, or drop them when they have nothing left
+        del self._queues[user]
+        if user_queue:
+            self._queues[user] = user_queue
+        self._queued -= 1
+        return job
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._queues:
+                    self._condition.wait()
+                job = self._next_job()
+                self._running += 1
+            try:
+                job.run()
+            finally:
+                with self._condition:
+                    self._running -= 1
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler():
+    # One scheduler per process, shared by every session
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RenderScheduler()
+        return _scheduler
+
+def follow_job(job, placeholder, poll_seconds=1.0, on_output=None):
+    # Report queue position and progress until the job finishes; placeholder is an st.empty()
+    reported_outputs = 0
+    while True:
+        finished = job.wait(poll_seconds)
+        if on_output is not None:
+            for output in job.outputs[reported_outputs:]:
+                on_output(output)
+            reported_outputs = len(job.outputs)
+        if finished:
+            break
+        position = job.position()
+        if position is not None:
+            placeholder.info(f"Queued, position {position}")
+        else:
+            placeholder.info("Rendering...")
+    placeholder.empty()
+    if job.error is not None:
+        raise job.error
+    return job.result
@@ -0,0 +1,498 @@
+# Local HTTP service around ID generation and the batch archive builder, for callers that
+# schedule runs themselves. Standard library only and fully offline:
+#
+#   python -m pdfcreator.service --port 8765
+#
+#   POST /uploads                   request body is the file (Excel, logo or font) -> {"upload": id}
+#   DELETE /uploads/<id>            remove an upload no queued or running job still needs
+#   POST /jobs/ids                  JSON {"excel": upload, "partner_id": 5, ...} -> {"job": id}
+#   POST /jobs/sheets               JSON {"excel": upload or "ids_job": job, "logo": upload, ...} -> {"job": id}
+#   GET  /jobs/<id>                 state, queue position and the outputs finished so far
+#   GET  /jobs/<id>/outputs/<name>  one output, streamed back in chunks
+#   GET  /jobs/<id>/manifest        manifest of a sharded archive job
+#
+# Uploads are read in chunks straight to disk, jobs run on the shared render scheduler and
+# write their outputs to files in a directory of their own, and outputs are streamed from
+# those files with chunked transfer encoding as soon as they are finished.
+# Uploads expire after upload_retention_hours unless a job still needs them, and finished
+# jobs (and their files) are removed oldest first once they hold more than max_kept_output_bytes.
+import argparse
+import io
+import json
+import math
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from pdfcreator.scheduler import QueueFull, get_scheduler
+
+chunk_size = 64 * 1024
+max_upload_bytes = int(os.environ.get('PDFCREATOR_MAX_UPLOAD_MB', 512)) * 1024 * 1024
+
+# Finished jobs beyond this many, or beyond this much output kept on disk, are forgotten, oldest first
+max_kept_jobs = 256
+max_kept_output_bytes = int(os.environ.get('PDFCREATOR_MAX_KEPT_OUTPUT_MB', 1024)) * 1024 * 1024
+
+# Uploads not used by a queued or running job are deleted after this long
+upload_retention_hours = float(os.environ.get('PDFCREATOR_UPLOAD_RETENTION_HOURS', 24))
+
+# Defaults match the widgets in singleappcode.py
+id_defaults = {
+    'partner_id': 0,
+    'buffer_percent': 30.0,
+    'grade': 1,
+    'district_digits': 2,
+    'block_digits': 2,
+    'school_digits': 3,
+    'student_digits': 4,
+    'param_set': 'A1',
+    'passcodes': True,
+    'passcode_length': 6
+}
+
+# (whole number, minimum, maximum) for the numeric ID options, as the widgets allow
+id_limits = {
+    'partner_id': (True, 0, None),
+    'buffer_percent': (False, 0, 100),
+    'grade': (True, 1, None),
+    'district_digits': (True, 1, None),
+    'block_digits': (True, 1, None),
+    'school_digits': (True, 1, None),
+    'student_digits': (True, 1, None),
+    'passcode_length': (True, 4, 12)
+}
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def bool_option(request, key, default):
+    # Only JSON true/false; bool("false") would turn the option on
+    value = request.get(key, default)
+    if not isinstance(value, bool):
+        raise RequestError(HTTPStatus.BAD_REQUEST, f"'{key}' must be true or false")
+    return value
+
+def number_option(request, key, default=None, integer=False, minimum=None, maximum=None):
+    value = request.get(key, default)
+    kind = 'a whole number' if integer else 'a number'
+    if (isinstance(value, bool) or not isinstance(value, int if integer else (int, float)) or not math.isfinite(value)
+            or (minimum is not None and value < minimum) or (maximum is not None and value > maximum)):
+        limits = [f'at least {minimum}'] if minimum is not None else []
+        limits += [f'at most {maximum}'] if maximum is not None else []
+        message = f"'{key}' must be {kind}"
+        if limits:
+            message += ' ' + ' and '.join(limits)
+        raise RequestError(HTTPStatus.BAD_REQUEST, message)
+    return value
+
+def output_bytes(entry):
+    # Size of a finished job's output files, plus the in-memory roster of an IDs job
+    if 'bytes' not in entry:
+        size = 0
+        for output in entry['job'].outputs:
+            size += output['size']
+            if output.get('roster') is not None:
+                size += output['roster'].nbytes
+        entry['bytes'] = size
+    return entry['bytes']
+
+def file_output(name, path, **fields):
+    return {'name': name, 'file_name': os.path.basename(path), 'path': path, 'size': os.path.getsize(path), **fields}
+
+def generate_ids(excel_path, options, job_dir):
+    # Job: the two ID workbooks, written to job_dir; the compact roster is kept for a follow-up sheets job
+    from pdfcreator.compact import CompactRoster
+    from pdfcreator.ids import write_frames_excel
+
+    roster = CompactRoster.from_excel(
+        excel_path, options['partner_id'], options['buffer_percent'], options['grade'], options['district_digits'],
+        options['block_digits'], options['school_digits'], options['student_digits'], options['param_set']
+    )
+    if options['passcodes']:
+        roster.add_passcodes(int(options['passcode_length']))
+
+    student_ids_path = os.path.join(job_dir, 'Student_Ids.xlsx')
+    write_frames_excel(roster.iter_expanded_frames(), student_ids_path)
+    yield file_output('student_ids', student_ids_path)
+    mapped_ids_path = os.path.join(job_dir, 'Student_Ids_Mapped.xlsx')
+    write_frames_excel(roster.iter_mapped_frames(), mapped_ids_path)
+    yield file_output('mapped_ids', mapped_ids_path, roster=roster)
+
+def generate_sheets(source, logo_path, mode, max_volume_bytes, options, job_dir):
+    # Job: source is an attendance Excel path or the compact roster of an IDs job; archives are written to job_dir
+    from pdfcreator import archive, sheets
+
+    if isinstance(source, str):
+        df = sheets.load_attendance_data(source)
+        result = sheets.group_attendance_records(df)
+    else:
+        df = source
+        result = source.attendance_records()
+    with open(logo_path, 'rb') as logo_file:
+        logo = logo_file.read()
+    yield from archive.render_archives(df, result, logo, mode, max_volume_bytes, output_dir=job_dir, **options)
+
+class GenerationService:
+    def __init__(self, upload_dir=None, output_dir=None):
+        # Job directories always go in a fresh directory of this service's own, under output_dir if given
+        self.own_upload_dir = upload_dir is None
+        self.upload_dir = upload_dir or tempfile.mkdtemp(prefix='pdfcreator_uploads_')
+        os.makedirs(self.upload_dir, exist_ok=True)
+        self.output_dir = tempfile.mkdtemp(prefix='pdfcreator_outputs_', dir=output_dir)
+        self.uploads = {}  # upload id -> {'path', 'stored'}
+        self.jobs = OrderedDict()  # job id -> {'job', 'kind', 'mode', 'uploads', 'dir'}
+        self.lock = threading.Lock()
+
+    def close(self):
+        if self.own_upload_dir:
+            shutil.rmtree(self.upload_dir, ignore_errors=True)
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def uploads_in_use(self):
+        # Called with the lock held; paths a queued or running job will still read
+        return {path for entry in self.jobs.values() if not entry['job'].done() for path in entry['uploads']}
+
+    def prune_uploads(self):
+        cutoff = time.time() - upload_retention_hours * 60 * 60
+        with self.lock:
+            in_use = self.uploads_in_use()
+            expired = [
+                upload_id for upload_id, upload in self.uploads.items()
+                if upload['stored'] < cutoff and upload['path'] not in in_use
+            ]
+            paths = [self.uploads.pop(upload_id)['path'] for upload_id in expired]
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def delete_upload(self, upload_id):
+        with self.lock:
+            upload = self.uploads.get(upload_id)
+            if upload is None:
+                raise RequestError(HTTPStatus.NOT_FOUND, f"No upload {upload_id}")
+            if upload['path'] in self.uploads_in_use():
+                raise RequestError(HTTPStatus.CONFLICT, f"Upload {upload_id} is used by a queued or running job")
+            del self.uploads[upload_id]
+        os.remove(upload['path'])
+        return {'upload': upload_id, 'deleted': True}
+
+    def store_upload(self, chunks):
+        self.prune_uploads()
+        upload_id = uuid.uuid4().hex
+        path = os.path.join(self.upload_dir, upload_id)
+        size = 0
+        try:
+            with open(path, 'wb') as upload_file:
+                for chunk in chunks:
+                    size += len(chunk)
+                    if size > max_upload_bytes:
+                        raise RequestError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Uploads are limited to {max_upload_bytes // (1024 * 1024)} MB")
+                    upload_file.write(chunk)
+        except BaseException:
+            os.remove(path)
+            raise
+        with self.lock:
+            self.uploads[upload_id] = {'path': path, 'stored': time.time()}
+        return {'upload': upload_id, 'size': size}
+
+    def upload_path(self, upload_id, field):
+        with self.lock:
+            upload = self.uploads.get(upload_id) if isinstance(upload_id, str) else None
+        if upload is None:
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"'{field}' must be the id of an earlier upload")
+        return upload['path']
+
+    def prune_jobs(self):
+        # Called with the lock held; output files are kept until their job is forgotten
+        finished = [(job_id, entry) for job_id, entry in self.jobs.items() if entry['job'].done()]
+        kept_bytes = sum(output_bytes(entry) for _, entry in finished)
+        excess = len(self.jobs) - max_kept_jobs
+        for job_id, entry in finished:
+            if excess <= 0 and kept_bytes <= max_kept_output_bytes:
+                break
+            del self.jobs[job_id]
+            shutil.rmtree(entry['dir'], ignore_errors=True)
+            excess -= 1
+            kept_bytes -= output_bytes(entry)
+
+    def submit(self, user, kind, fn, *args, mode=None, uploads=()):
+        # uploads are the upload paths the job reads once it runs; fn also gets the directory for its outputs
+        with self.lock:
+            self.prune_jobs()
+            job_dir = tempfile.mkdtemp(prefix=f'{kind}_', dir=self.output_dir)
+            try:
+                job = get_scheduler().submit(user, fn, *args, job_dir)
+            except QueueFull as error:
+                shutil.rmtree(job_dir, ignore_errors=True)
+                raise RequestError(HTTPStatus.TOO_MANY_REQUESTS, str(error))
+            self.jobs[job.id] = {'job': job, 'kind': kind, 'mode': mode, 'uploads': set(uploads), 'dir': job_dir}
+        return self.status(job.id)
+
+    def submit_ids(self, user, request):
+        from pdfcreator.ids import parameter_mapping
+
+        excel_path = self.upload_path(request.get('excel'), 'excel')
+        options = {key: request.get(key, default) for key, default in id_defaults.items()}
+        for key, (integer, minimum, maximum) in id_limits.items():
+            number_option(options, key, integer=integer, minimum=minimum, maximum=maximum)
+        options['passcodes'] = bool_option(options, 'passcodes', True)
+        if options['param_set'] not in parameter_mapping:
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"'param_set' must be one of {', '.join(parameter_mapping)}")
+        return self.submit(user, 'ids', generate_ids, excel_path, options, uploads=(excel_path,))
+
+    def submit_sheets(self, user, request):
+        from pdfcreator import archive, fonts, rosters
+
+        if request.get('ids_job') is not None:
+            ids_job = self.job_entry(request['ids_job'])
+            if ids_job['kind'] != 'ids' or ids_job['job'].state != 'done':
+                raise RequestError(HTTPStatus.CONFLICT, "'ids_job' must be a finished IDs job")
+            source = ids_job['job'].outputs[-1]['roster']
+        else:
+            source = self.upload_path(request.get('excel'), 'excel')
+        logo_path = self.upload_path(request.get('logo'), 'logo')
+
+        mode = request.get('mode', 'single')
+        if mode not in archive.archive_modes:
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"'mode' must be one of {', '.join(archive.archive_modes)}")
+        if mode == 'volumes' and request.get('max_volume_mb') is None:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "'max_volume_mb' is required for the 'volumes' mode")
+        max_volume_bytes = None
+        if request.get('max_volume_mb') is not None:
+            max_volume_bytes = int(number_option(request, 'max_volume_mb', minimum=1) * 1024 * 1024)
+        if request.get('rosters') not in (None,) + rosters.roster_modes:
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"'rosters' must be one of {', '.join(rosters.roster_modes)}")
+
+        if request.get('font') is not None:
+            with open(self.upload_path(request['font'], 'font'), 'rb') as font_file:
+                font_path = fonts.store_uploaded_font(font_file.read())
+        else:
+            font_path = fonts.default_font_path()
+
+        options = {
+            'font_path': font_path,
+            'autofit': bool_option(request, 'autofit', True),
+            'barcodes': bool_option(request, 'barcodes', False),
+            'deterministic': bool_option(request, 'deterministic', True),
+            'rosters': request.get('rosters')
+        }
+        uploads = (logo_path,) if request.get('ids_job') is not None else (source, logo_path)
+        return self.submit(user, 'sheets', generate_sheets, source, logo_path, mode, max_volume_bytes, options, mode=mode, uploads=uploads)
+
+    def job_entry(self, job_id):
+        try:
+            job_id = int(job_id)
+        except (TypeError, ValueError):
+            job_id = None
+        with self.lock:
+            entry = self.jobs.get(job_id)
+        if entry is None:
+            raise RequestError(HTTPStatus.NOT_FOUND, f"No job {job_id}")
+        return entry
+
+    def status(self, job_id):
+        entry = self.job_entry(job_id)
+        job = entry['job']
+        return {
+            'job': job.id,
+            'kind': entry['kind'],
+            'state': job.state,
+            'position': job.position(),
+            'error': str(job.error) if job.error is not None else None,
+            'outputs': [
+                {'name': output['name'], 'file_name': output['file_name'], 'size': output['size']}
+                for output in list(job.outputs)
+            ]
+        }
+
+    def output(self, job_id, name):
+        for output in list(self.job_entry(job_id)['job'].outputs):
+            if output['name'] == name:
+                return output
+        raise RequestError(HTTPStatus.NOT_FOUND, f"Job {job_id} has no finished output '{name}'")
+
+    def manifest(self, job_id):
+        from pdfcreator import archive
+
+        entry = self.job_entry(job_id)
+        if entry['kind'] != 'sheets' or entry['mode'] == 'single':
+            raise RequestError(HTTPStatus.NOT_FOUND, "Only sharded archive jobs have a manifest")
+        if entry['job'].state != 'done':
+            raise RequestError(HTTPStatus.CONFLICT, f"Job {job_id} is {entry['job'].state}")
+        return archive.build_manifest(entry['job'].outputs, entry['mode'])
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'pdfcreator'
+
+    routes = [
+        ('POST', re.compile(r'/uploads'), 'post_upload'),
+        ('DELETE', re.compile(r'/uploads/(\w+)'), 'delete_upload'),
+        ('POST', re.compile(r'/jobs/ids'), 'post_ids'),
+        ('POST', re.compile(r'/jobs/sheets'), 'post_sheets'),
+        ('GET', re.compile(r'/jobs/(\d+)'), 'get_status'),
+        ('GET', re.compile(r'/jobs/(\d+)/outputs/([\w.-]+)'), 'get_output'),
+        ('GET', re.compile(r'/jobs/(\d+)/manifest'), 'get_manifest')
+    ]
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def do_GET(self):
+        self.dispatch('GET')
+
+    def do_POST(self):
+        self.dispatch('POST')
+
+    def do_DELETE(self):
+        self.dispatch('DELETE')
+
+    def dispatch(self, method):
+        path = self.path.split('?', 1)[0].rstrip('/')
+        try:
+            for route_method, pattern, handler_name in self.routes:
+                match = pattern.fullmatch(path)
+                if match and route_method == method:
+                    getattr(self, handler_name)(*match.groups())
+                    return
+            raise RequestError(HTTPStatus.NOT_FOUND, f"No route for {method} {path}")
+        except RequestError as error:
+            # The rest of an unread request body would be taken for the next request
+            self.close_connection = True
+            self.send_json({'error': str(error)}, error.status)
+
+    @property
+    def user(self):
+        # Queue fairness is per caller; schedulers can name themselves with X-User
+        return self.headers.get('X-User') or self.client_address[0]
+
+    def body_chunks(self):
+        # Read the request body piece by piece, with or without chunked transfer encoding
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            while True:
+                try:
+                    size = int(self.rfile.readline().split(b';', 1)[0], 16)
+                except ValueError:
+                    raise RequestError(HTTPStatus.BAD_REQUEST, "Malformed chunked request body")
+                if size == 0:
+                    while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+                        pass  # trailers
+                    return
+                remaining = size
+                while remaining:
+                    chunk = self.rfile.read(min(chunk_size, remaining))
+                    if not chunk:
+                        raise RequestError(HTTPStatus.BAD_REQUEST, "Request body ended early")
+                    remaining -= len(chunk)
+                    yield chunk
+                self.rfile.readline()
+        elif self.headers.get('Content-Length') is not None:
+            try:
+                remaining = int(self.headers['Content-Length'])
+            except ValueError:
+                remaining = -1
+            if remaining < 0:
+                raise RequestError(HTTPStatus.BAD_REQUEST, "Content-Length must be a non-negative whole number")
+            while remaining:
+                chunk = self.rfile.read(min(chunk_size, remaining))
+                if not chunk:
+                    raise RequestError(HTTPStatus.BAD_REQUEST, "Request body ended early")
+                remaining -= len(chunk)
+                yield chunk
+        else:
+            raise RequestError(HTTPStatus.LENGTH_REQUIRED, "Send Content-Length or chunked transfer encoding")
+
+    def read_json(self):
+        body = b''.join(self.body_chunks())
+        try:
+            request = json.loads(body or b'{}')
+        except ValueError:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "The request body must be JSON")
+        if not isinstance(request, dict):
+            raise RequestError(HTTPStatus.BAD_REQUEST, "The request body must be a JSON object")
+        return request
+
+    def send_json(self, payload, status=HTTPStatus.OK):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_chunked(self, stream, file_name, content_type):
+        # stream is a binary file, read and sent chunk_size bytes at a time
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Disposition', f'attachment; filename="{file_name}"')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for chunk in iter(lambda: stream.read(chunk_size), b''):
+            self.wfile.write(b'%x\r\n' % len(chunk))
+            self.wfile.write(chunk)
+            self.wfile.write(b'\r\n')
+        self.wfile.write(b'0\r\n\r\n')
+
+    def post_upload(self):
+        self.send_json(self.service.store_upload(self.body_chunks()), HTTPStatus.CREATED)
+
+    def delete_upload(self, upload_id):
+        self.send_json(self.service.delete_upload(upload_id))
+
+    def post_ids(self):
+        self.send_json(self.service.submit_ids(self.user, self.read_json()), HTTPStatus.ACCEPTED)
+
+    def post_sheets(self):
+        self.send_json(self.service.submit_sheets(self.user, self.read_json()), HTTPStatus.ACCEPTED)
+
+    def get_status(self, job_id):
+        self.send_json(self.service.status(job_id))
+
+    def get_output(self, job_id, name):
+        output = self.service.output(job_id, name)
+        content_type = 'application/zip' if output['file_name'].endswith('.zip') else 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        # Opened before the response starts; the file stays readable even if its job is pruned meanwhile
+        with open(output['path'], 'rb') as output_file:
+            self.send_chunked(output_file, output['file_name'], content_type)
+
+    def get_manifest(self, job_id):
+        self.send_chunked(io.BytesIO(self.service.manifest(job_id)), 'attendance_Sheets_manifest.json', 'application/json')
+
+def make_server(host='127.0.0.1', port=8765, upload_dir=None, output_dir=None):
+    server = ThreadingHTTPServer((host, port), ServiceHandler)
+    server.daemon_threads = True
+    server.service = GenerationService(upload_dir, output_dir)
+    return server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local HTTP service for student IDs and attendance sheets")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--upload-dir', help="where uploads are kept while the service runs (default: a temporary directory)")
+    parser.add_argument('--output-dir', help="where job outputs are written (default: the system temporary directory)")
+    args = parser.parse_args(argv)
+
+    server = make_server(args.host, args.port, args.upload_dir, args.output_dir)
+    print(f"Serving on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+# Zero-copy handoff of a render batch to the shared render processes. The parent formats and
+# writes one window of schools at a time, their student IDs and passcodes grouped by school
+# in .npy files, and queues the window's tasks as soon as it is on disk. A render process
+# memory-maps a window the first time it gets one of its tasks, so the pages share one copy
+# through the OS page cache and a task only carries the window directory, a school index
+# and a page range.
+import contextlib
+import os
+import pickle
+import shutil
+import tempfile
+from collections import OrderedDict
+
+from pdfcreator import pagination
+
+def _fixed_width(values):
+    # One byte per character where the text allows it, otherwise numpy's four-byte unicode
+    import numpy as np
+
+    array = np.asarray(values, dtype=str)
+    try:
+        return array.astype(f'S{max(array.itemsize // 4, 1)}')
+    except UnicodeEncodeError:
+        return array
+
+class SharedBatch:
+    def __init__(self, directory, students, options):
+        # students(record) -> (student IDs, passcodes), as from pagination.student_positions
+        self.directory = directory
+        self.students = students
+        self.windows = 0
+        with open(os.path.join(directory, 'options.pkl'), 'wb') as options_file:
+            pickle.dump(options, options_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def write_window(self, records):
+        # Format and write one window of schools; returns the path its tasks refer to
+        import numpy as np
+
+        path = os.path.join(self.directory, f'window{self.windows:06d}')
+        self.windows += 1
+        os.mkdir(path)
+
+        offsets = [0]
+        all_ids, all_passcodes = [], []
+        for record in records:
+            student_ids, passcodes = self.students(record)
+            # Every school has a passcode slot per student, empty when none were generated
+            all_ids.extend(str(student_id) for student_id in student_ids)
+            all_passcodes.extend(str(passcode) for passcode in passcodes)
+            all_passcodes.extend([''] * (len(student_ids) - len(passcodes)))
+            offsets.append(offsets[-1] + len(student_ids))
+
+        np.save(os.path.join(path, 'offsets.npy'), np.asarray(offsets, dtype=np.int64))
+        np.save(os.path.join(path, 'student_ids.npy'), _fixed_width(all_ids))
+        np.save(os.path.join(path, 'passcodes.npy'), _fixed_width(all_passcodes))
+        with open(os.path.join(path, 'records.pkl'), 'wb') as records_file:
+            pickle.dump(list(records), records_file, protocol=pickle.HIGHEST_PROTOCOL)
+        return path
+
+    def release(self, path):
+        # Once every task of a window has finished; processes that mapped it keep their mapping
+        shutil.rmtree(path, ignore_errors=True)
+
+@contextlib.contextmanager
+def shared_batch(students, options):
+    directory = tempfile.mkdtemp(prefix='pdfcreator_shared_')
+    try:
+        yield SharedBatch(directory, students, options)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+# Windows mapped by this render process, most recent last; the pool serves several jobs at once
+_windows = OrderedDict()
+max_attached_windows = 8
+
+def attach(path):
+    import numpy as np
+
+    window = _windows.get(path)
+    if window is not None:
+        _windows.move_to_end(path)
+        return window
+
+    window = {}
+    with open(os.path.join(os.path.dirname(path), 'options.pkl'), 'rb') as options_file:
+        window['options'] = pickle.load(options_file)
+    with open(os.path.join(path, 'records.pkl'), 'rb') as records_file:
+        window['records'] = pickle.load(records_file)
+    for name in ('offsets', 'student_ids', 'passcodes'):
+        window[name] = np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+    _windows[path] = window
+    while len(_windows) > max_attached_windows:
+        _windows.popitem(last=False)
+    return window
+
+def _texts(array):
+    if array.dtype.kind == 'S':
+        return [value.decode('utf-8') for value in array.tolist()]
+    return array.tolist()
+
+def render_shared_pages(path, school, first, last):
+    # Pages first..last of one school of a window, reading its rows straight from the mapped arrays
+    window = attach(path)
+    record = window['records'][school]
+    pages = pagination.plan_pages(record.get('student_count', 0))[first:last]
+    base, school_end = int(window['offsets'][school]), int(window['offsets'][school + 1])
+    start, end = base + pages[0][0], min(school_end, base + pages[-1][1])
+
+    passcodes = _texts(window['passcodes'][start:end])
+    if not any(passcodes):
+        passcodes = []
+    return pagination.render_pages(record, pages, _texts(window['student_ids'][start:end]), passcodes, window['options'])
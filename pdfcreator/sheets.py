@@ -0,0 +1,331 @@
+# Attendance sheet rendering shared by the apps; fpdf and pandas are imported on first use
+import contextlib
+import io
+import os
+import tempfile
+import time
+import zipfile
+
+from pdfcreator import fonts
+from pdfcreator.barcode import barcode_width, draw_code128
+
+# Rename the mapped ID columns to the headers the attendance sheets expect
+attendance_column_mapping = {
+    'Roll_Number': 'STUDENT ID',
+    'PASSCODE': 'PASSCODE',
+    'School Code': 'School Code',
+    'School Name': 'SCHOOL NAME',
+    'District Name': 'DISTRICT',
+    'Block Name': 'BLOCK',
+    'Grade': 'CLASS'
+}
+
+# Per-student columns; everything else identifies the school group
+student_columns = ['STUDENT ID', 'PASSCODE']
+
+# Number of columns and column names for the table
+column_names = ['S.NO', 'STUDENT ID', 'PASSCODE', 'STUDENT NAME', 'GENDER', 'TAB ID', 'SUBJECT 1 (PRESENT/ABSENT)', 'SUBJECT 2 (PRESENT/ABSENT)']
+column_widths = {
+    'S.NO': 8,
+    'STUDENT ID': 18,
+    'PASSCODE': 18,
+    'STUDENT NAME': 61,
+    'GENDER': 15,
+    'TAB ID': 15,
+    'SUBJECT 1 (PRESENT/ABSENT)': 35,
+    'SUBJECT 2 (PRESENT/ABSENT)': 35
+}
+
+# Height of the table header and of each student row, in mm
+table_cell_height = 10
+
+def new_attendance_pdf(deterministic=False):
+    from pdfcreator.pdf import AttendancePDF
+
+    pdf = AttendancePDF(orientation='P', unit='mm', format='A4', deterministic=deterministic)
+    pdf.set_left_margin(10)
+    pdf.set_right_margin(10)
+    return pdf
+
+def repeat_pages(pdf, first_page, last_page, copies):
+    # Reuse already laid-out page content streams instead of drawing the pages again
+    contents = [pdf.pages[n] for n in range(first_page, last_page + 1)]
+    for _ in range(copies):
+        for content in contents:
+            pdf.add_page()
+            pdf.pages[pdf.page] = content
+
+def image_suffix(image_bytes):
+    # fpdf picks the image parser from the file extension
+    if image_bytes[:2] == b'\xff\xd8':
+        return '.jpg'
+    if image_bytes[:4] == b'GIF8':
+        return '.gif'
+    return '.png'
+
+@contextlib.contextmanager
+def temporary_image(image_bytes):
+    # fpdf reads images from a path; each caller gets its own file so concurrent renders never collide
+    if isinstance(image_bytes, str):
+        # Already a path or URL
+        yield image_bytes
+        return
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=image_suffix(image_bytes)) as tmp_image_file:
+        tmp_image_file.write(image_bytes)
+        image_path = tmp_image_file.name
+    try:
+        yield image_path
+    finally:
+        os.remove(image_path)
+
+# Timestamp for archive entries in deterministic mode (the earliest date zip supports)
+fixed_zip_date = (1980, 1, 1, 0, 0, 0)
+
+def write_zip_entry(zip_file, name, data, deterministic=False):
+    if deterministic:
+        # A fixed timestamp and permissions keep archive bytes identical across runs
+        entry = zipfile.ZipInfo(name, date_time=fixed_zip_date)
+        entry.compress_type = zip_file.compression
+        entry.external_attr = 0o644 << 16
+        zip_file.writestr(entry, data)
+    else:
+        zip_file.writestr(name, data)
+
+def open_zip_entry(zip_file, name, deterministic=False):
+    # Writable entry for streaming a document into the archive, with write_zip_entry's metadata
+    entry = zipfile.ZipInfo(name, date_time=fixed_zip_date if deterministic else time.localtime()[:6])
+    entry.compress_type = zip_file.compression
+    entry.external_attr = 0o644 << 16 if deterministic else 0o600 << 16
+    return zip_file.open(entry, 'w')
+
+def pdf_bytes(pdf):
+    # fpdf returns the document as a latin-1 str, fpdf2 as a bytearray
+    output = pdf.output(dest='S')
+    if isinstance(output, str):
+        return output.encode('latin-1')
+    return bytes(output)
+
+def load_attendance_data(excel_file):
+    import pandas as pd
+
+    return pd.read_excel(excel_file)
+
+def match_info_labels(info_values):
+    info_labels = {
+        'PROJECT': '',
+        'DISTRICT': '',
+        'BLOCK': '',
+        'SCHOOL NAME': '',
+        'CLASS': '',
+        'SECTION': ''
+    }
+
+    for label in info_labels.keys():
+        # Prefer the exact column, so 'School Code' does not fill SCHOOL NAME
+        exact_keys = [key for key in info_values.keys() if key.lower() == label.lower()]
+        for key in exact_keys + list(info_values.keys()):
+            if label[:5].lower() == key[:5].lower():  # Match first 5 characters, ignoring case
+                info_labels[label] = info_values[key]
+                break
+
+    return info_labels
+
+def register_fonts(pdf, font_path=None):
+    # Register every font in a fixed order, so /F indexes agree between documents whose pages are merged
+    pdf.set_font('Arial', 'B', 16)
+    pdf.set_font('Arial', '', 7)
+    if font_path:
+        fonts.add_unicode_font(pdf, font_path)
+
+def draw_title_block(pdf, column_widths, column_names, image_path, info_values, font_path=None, layout=None):
+    layout = layout or {}
+
+    # Add the combined title and subtitle in a single merged cell
+    pdf.set_font('Arial', 'B', 16)
+    merged_cell_width = sum(column_widths[col] for col in column_names)  # Total width based on scaled column widths
+    pdf.cell(merged_cell_width, 10, 'ATTENDANCE LIST', border='LTR', align='C', ln=1)
+    pdf.set_font('Arial', '', 7)
+    pdf.cell(merged_cell_width, 10, '(PLEASE FILL ALL THE DETAILS IN BLOCK LETTERS)', border='LBR', align='C', ln=1)
+
+    # Add the image in the top-right corner of the bordered cell
+    pdf.image(image_path, x=pdf.get_x() + merged_cell_width - 30, y=pdf.get_y() - 18, w=28, h=12)  # Adjust position and size as needed
+
+    # Add the additional information cell below the "ATTENDANCE LIST" cell
+    if font_path:
+        # School, block and district names may be in regional scripts
+        pdf.set_font(fonts.add_unicode_font(pdf, font_path), '', layout.get('info_font_size', 6))
+    else:
+        pdf.set_font('Arial', 'B', layout.get('info_font_size', 6))
+    info_cell_width = merged_cell_width  # Width same as the merged title cell
+    info_cell_height = 30  # Adjust height as needed
+    pdf.cell(info_cell_width, info_cell_height, '', border='LBR', ln=1)
+    pdf.set_xy(pdf.get_x(), pdf.get_y() - info_cell_height)  # Move back to the top of the cell
+
+    # Add labels and fill values from the dictionary
+    info_labels = match_info_labels(info_values)
+
+    pdf.cell(info_cell_width, 5, f"PROJECT: {info_labels['PROJECT']}", border='LR', ln=1)
+    pdf.cell(info_cell_width, 5, f"DISTRICT: {info_labels['DISTRICT']}                                                                                                                                                                            DATE OF ASSESSMENT : ____________________", border='LR', ln=1)
+    pdf.cell(info_cell_width, 5, f"BLOCK: {info_labels['BLOCK']}", border='LR', ln=1)
+    pdf.cell(info_cell_width, 5, f"SCHOOL NAME: {info_labels['SCHOOL NAME']}", border='LR', ln=1)
+    pdf.cell(info_cell_width, 5, f"CLASS: {info_labels['CLASS']}", border='LR', ln=1)
+    pdf.cell(info_cell_width, 5, f"SECTION: {info_labels['SECTION']}", border='LR', ln=1)
+
+def draw_table_header(pdf, column_widths, column_names, layout=None):
+    pdf.set_font('Arial', 'B', (layout or {}).get('header_font_size', 5.5))
+    for col_name in column_names:
+        pdf.cell(column_widths[col_name], table_cell_height, col_name, border=1, align='C')
+    pdf.ln(table_cell_height)
+
+def draw_student_rows(pdf, column_widths, column_names, student_ids, passcodes, start, end, layout=None, barcodes=False):
+    # Rows start..end of the school; student_ids and passcodes are indexed from start
+    pdf.set_font('Arial', '', (layout or {}).get('row_font_size', 7))
+    for i in range(start, end):
+        # Fill in S.NO column
+        pdf.cell(column_widths['S.NO'], table_cell_height, str(i + 1), border=1, align='C')
+
+        # Fill in STUDENT ID column
+        student_id = student_ids[i - start]
+        if barcodes:
+            # Barcode in the upper part of the cell, human-readable ID below it
+            x, y = pdf.get_x(), pdf.get_y()
+            pdf.cell(column_widths['STUDENT ID'], table_cell_height, '', border=1)
+            draw_code128(pdf, student_id, x, y + 1, column_widths['STUDENT ID'], table_cell_height * 0.5)
+            pdf.set_xy(x, y + table_cell_height * 0.6)
+            pdf.cell(column_widths['STUDENT ID'], table_cell_height * 0.4, str(student_id), align='C')
+            pdf.set_xy(x + column_widths['STUDENT ID'], y)
+        else:
+            pdf.cell(column_widths['STUDENT ID'], table_cell_height, str(student_id), border=1, align='C')
+
+        # Fill in PASSCODE when generated and leave the remaining columns empty
+        for col_name in column_names[2:]:  # Skip first two columns
+            value = passcodes[i - start] if col_name == 'PASSCODE' and i - start < len(passcodes) else ''
+            pdf.cell(column_widths[col_name], table_cell_height, str(value), border=1, align='C')
+
+        pdf.ln(table_cell_height)
+
+def scale_column_widths(column_widths, column_names, layout=None):
+    # Widths and font sizes from the batch auto-fit pass, if any
+    layout = layout or {}
+    if 'column_widths' in layout:
+        column_widths = layout['column_widths']
+
+    # Page width and margins
+    page_width = 210  # A4 page width in mm
+    margin_left = 10
+    margin_right = 10
+    available_width = page_width - margin_left - margin_right
+
+    # Scale column widths if necessary
+    total_column_width = sum(column_widths[col] for col in column_names)
+    if total_column_width > available_width:
+        scaling_factor = available_width / total_column_width
+        column_widths = {col: width * scaling_factor for col, width in column_widths.items()}
+    return column_widths
+
+def draw_attendance_pages(pdf, column_widths, column_names, image_path, info_values, student_ids, passcodes, pages, font_path=None, layout=None, barcodes=False):
+    # pages are (start, end) row ranges from pagination.plan_pages; the page holding row 0
+    # carries the title block and every page repeats the table header
+    column_widths = scale_column_widths(column_widths, column_names, layout)
+    first_row = pages[0][0]
+
+    # Breaks are planned, so fpdf must not insert its own
+    auto_page_break, break_margin = pdf.auto_page_break, pdf.b_margin
+    pdf.set_auto_page_break(False)
+    try:
+        for start, end in pages:
+            pdf.add_page()
+            if start == 0:
+                draw_title_block(pdf, column_widths, column_names, image_path, info_values, font_path, layout)
+            draw_table_header(pdf, column_widths, column_names, layout)
+            draw_student_rows(pdf, column_widths, column_names, student_ids[start - first_row:end - first_row], passcodes[start - first_row:end - first_row], start, end, layout, barcodes)
+    finally:
+        pdf.set_auto_page_break(auto_page_break, break_margin)
+
+def school_students(df, info_values):
+    # Student IDs and passcodes for the selected school code
+    school_rows = df[df['School Code'] == info_values.get('School Code', '')]
+    student_ids = school_rows['STUDENT ID'].tolist()
+    passcodes = school_rows['PASSCODE'].fillna('').tolist() if 'PASSCODE' in school_rows.columns else []
+    return student_ids, passcodes
+
+# Function to create the attendance list PDF
+def create_attendance_pdf(pdf, column_widths, column_names, image_path, info_values, df, font_path=None, layout=None, barcodes=False):
+    from pdfcreator.pagination import plan_pages
+
+    student_ids, passcodes = school_students(df, info_values)
+    student_count = info_values.get('student_count', 0)  # Use 0 if 'student_count' is missing or not found
+    draw_attendance_pages(pdf, column_widths, column_names, image_path, info_values, student_ids, passcodes, plan_pages(student_count), font_path, layout, barcodes)
+
+def prepare_attendance_data(data_mapped):
+    # Keep only the columns used by the sheets; Gender is per student and would split the school groups
+    columns = [col for col in attendance_column_mapping.keys() if col in data_mapped.columns]
+    df = data_mapped[columns].rename(columns=attendance_column_mapping)
+    return df.reset_index(drop=True)
+
+def group_attendance_records(df):
+    grouping_columns = [col for col in df.columns if col not in student_columns and df[col].notna().any()]
+    grouped = df.groupby(grouping_columns).agg(student_count=('STUDENT ID', 'nunique')).reset_index()
+
+    if 'CLASS' in grouped.columns and grouped['CLASS'].astype(str).str.contains(r'\D').any():
+        grouped['CLASS'] = grouped['CLASS'].astype(str).str.extract(r'(\d+)')
+
+    return grouped.to_dict(orient='records')
+
+def render_school_pdf(df, record, image_path, font_path=None, layout=None, barcodes=False, deterministic=False):
+    # Same page plan and merge as the batch path, so a school's PDF is identical either way
+    from pdfcreator.pagination import render_school_pdfs
+
+    return next(render_school_pdfs(df, [record], image_path, font_path=font_path, layout=layout, barcodes=barcodes, deterministic=deterministic, parallel=False))
+
+def student_column_chunks(df, column):
+    # A student column of the frame, or of a compact.CompactRoster a formatted chunk at a time
+    if hasattr(df, 'iter_column'):
+        return df.iter_column(column)
+    return [df[column]] if column in df.columns else []
+
+def narrow_barcode_count(df, layout=None):
+    # Students whose barcode would print with modules narrower than barcode.min_module_width.
+    # The symbol width only depends on the ID's length and whether it is all digits
+    id_width = scale_column_widths(column_widths, column_names, layout)['STUDENT ID']
+    shapes = {}  # (length, all digits) -> (students, one of their IDs)
+    for student_ids in student_column_chunks(df, 'STUDENT ID'):
+        student_ids = student_ids.dropna().astype(str)
+        for shape, group in student_ids.groupby([student_ids.str.len(), student_ids.str.isdigit()]):
+            count, sample = shapes.get(shape, (0, group.iloc[0]))
+            shapes[shape] = (count + len(group), sample)
+    return int(sum(count for count, sample in shapes.values() if barcode_width(sample) > id_width))
+
+def batch_layout(df, result, font_path=None, barcodes=False):
+    # Measure the batch once so every school shares the same column widths and font sizes
+    from pdfcreator.layout import autofit_layout
+
+    return autofit_layout(df, result, column_widths, column_names, font_path=font_path, barcodes=barcodes)
+
+def generate_attendance_zip(df, result, image_path, font_path=None, autofit=False, barcodes=False, deterministic=False, rosters=None, output=None):
+    # rosters: None, 'workbook' (an .xlsx next to each PDF) or 'sheet' (one rosters.xlsx).
+    # output: a writable binary file to build the zip in; without one the zip's bytes are returned
+    from pdfcreator import rosters as roster_workbooks
+    from pdfcreator.pagination import iter_school_parts, merge_school
+
+    layout = batch_layout(df, result, font_path, barcodes) if autofit else None
+    workbooks = roster_workbooks.iter_school_workbooks(df, result, deterministic=deterministic) if rosters == 'workbook' else None
+    zip_buffer = output if output is not None else io.BytesIO()
+    with zipfile.ZipFile(zip_buffer, 'w') as zip_file:
+        # PDFs are rendered on a process pool and come back in school order
+        school_parts = iter_school_parts(df, result, image_path, font_path=font_path, layout=layout, barcodes=barcodes, deterministic=deterministic)
+        for record, parts in zip(result, school_parts):
+            school_code = record.get('School Code', 'default_code')
+
+            # Stream each school's pages straight into its archive entry as they are merged
+            file_name = f'attendance_list_{school_code}.pdf'
+            with open_zip_entry(zip_file, file_name, deterministic) as entry:
+                merge_school(parts, entry)
+            if workbooks is not None:
+                write_zip_entry(zip_file, roster_workbooks.roster_path(file_name), next(workbooks), deterministic)
+
+        if rosters == 'sheet':
+            write_zip_entry(zip_file, 'rosters.xlsx', roster_workbooks.write_roster_workbook(df, result, deterministic), deterministic)
+
+    return zip_buffer.getvalue() if output is None else None
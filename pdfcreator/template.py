@@ -0,0 +1,91 @@
+# Blank attendance template used when a school has no roster
+import hashlib
+
+from pdfcreator import sheets
+from pdfcreator.cache import BytesLRUCache
+
+# Rendered templates keyed by logo hash, layout and number of copies
+template_cache = BytesLRUCache(max_entries=32)
+
+# Function to create the blank attendance list PDF
+def create_blank_attendance_pdf(pdf, column_widths, column_names, image_path):
+    pdf.add_page()
+
+    # Page width and margins
+    page_width = 210  # A4 page width in mm
+    margin_left = 10
+    margin_right = 10
+    available_width = page_width - margin_left - margin_right
+
+    # Calculate total column width
+    total_column_width = sum(column_widths[col] for col in column_names)
+
+    # Scale column widths if necessary
+    if total_column_width > available_width:
+        scaling_factor = available_width / total_column_width
+        column_widths = {col: width * scaling_factor for col, width in column_widths.items()}
+
+    # Add the combined title and subtitle in a single merged cell
+    pdf.set_font('Arial', 'B', 16)
+    merged_cell_width = sum(column_widths[col] for col in column_names)  # Total width based on scaled column widths
+    pdf.cell(merged_cell_width, 10, 'ATTENDANCE LIST', border='LTR', align='C', ln=1)
+    pdf.set_font('Arial', '', 7)
+    pdf.cell(merged_cell_width, 10, '(PLEASE FILL ALL THE DETAILS IN BLOCK LETTERS)', border='LBR', align='C', ln=1)
+
+    # Add the image in the top-right corner of the bordered cell
+    if image_path:
+        pdf.image(image_path, x=pdf.get_x() + merged_cell_width - 30, y=pdf.get_y() - 18, w=28, h=12)  # Adjust position and size as needed
+
+    # Add the additional information cell below the "ATTENDANCE LIST" cell
+    pdf.set_font('Arial', 'B', 6)
+    info_cell_width = merged_cell_width  # Width same as the merged title cell
+    info_cell_height = 30  # Adjust height as needed
+    pdf.cell(info_cell_width, info_cell_height, '', border='LBR', ln=1)
+    pdf.set_xy(pdf.get_x(), pdf.get_y() - info_cell_height)  # Move back to the top of the cell
+
+    # Add labels within the additional information cell
+    info_labels = [
+        'PROJECT :',
+        'DISTRICT :                                                                                                                                                                                                   DATE OF ASSESSMENT: _______________________',
+        'BLOCK :',
+        'SCHOOL NAME:',
+        'CLASS:',
+        'SECTION :'
+    ]
+    for label in info_labels:
+        pdf.cell(info_cell_width, 5, label, border='LR', ln=1)
+
+    # Draw a border around the table header
+    pdf.set_font('Arial', 'B', 5.5)
+    table_cell_height = 10
+
+    # Table Header
+    for col_name in column_names:
+        pdf.cell(column_widths[col_name], table_cell_height, col_name, border=1, align='C')
+    pdf.ln(table_cell_height)
+
+    # Table Rows (50 rows)
+    pdf.set_font('Arial', '', 10)
+    for i in range(50):
+        for col_name in column_names:
+            pdf.cell(column_widths[col_name], table_cell_height, '', border=1, align='C')
+        pdf.ln(table_cell_height)
+
+def render_blank_template(image_bytes, copies=1, column_widths=sheets.column_widths, column_names=sheets.column_names):
+    layout = tuple((col, column_widths[col]) for col in column_names)
+    key = (hashlib.sha256(image_bytes).hexdigest(), layout, copies)
+    cached = template_cache.get(key)
+    if cached is not None:
+        return cached
+
+    # Each render gets its own image file so concurrent sessions never share paths
+    with sheets.temporary_image(image_bytes) as image_path:
+        pdf = sheets.new_attendance_pdf()
+        create_blank_attendance_pdf(pdf, column_widths, column_names, image_path)
+
+    # Bulk copies reuse the template's page content, fonts and image
+    sheets.repeat_pages(pdf, 1, pdf.page, copies - 1)
+
+    pdf_data = sheets.pdf_bytes(pdf)
+    template_cache.put(key, pdf_data)
+    return pdf_data
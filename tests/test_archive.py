@@ -0,0 +1,19 @@
+import os
+
+import pytest
+
+from pdfcreator import archive, sheets
+from tests.test_rosters import school_frame
+
+logo_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cg.png')
+
+@pytest.mark.parametrize('rosters', [None, 'workbook', 'sheet'])
+def test_volumes_stay_under_the_cap(rosters):
+    df = school_frame(24, students=30)
+    result = sheets.group_attendance_records(df)
+    max_volume_bytes = 30 * 1024
+    shards = list(archive.iter_shard_entries(df, result, logo_path, 'volumes', max_volume_bytes, deterministic=True, rosters=rosters))
+    assert len(shards) > 1
+    for _, entries in shards:
+        assert sum(len(data) for _, data in entries) <= max_volume_bytes
+    assert sum(path.endswith('.pdf') for _, entries in shards for path, _ in entries) == len(result)
@@ -0,0 +1,42 @@
+import pandas as pd
+import pytest
+
+from pdfcreator import sheets
+from pdfcreator.barcode import encode_code128, min_module_width, quiet_zone, symbol_values
+
+@pytest.mark.parametrize('text, values', [
+    # Set C pairs, checksum (105 + 1*2 + 2*0 + 3*33 + 4*0 + 5*21) % 103 = 2
+    ('0200330021', [105, 2, 0, 33, 0, 21, 2, 106]),
+    # An odd trailing digit switches to set B
+    ('12345', [105, 12, 34, 100, 21, 54, 106]),
+    # Short or non-numeric IDs stay in set B
+    ('123', [104, 17, 18, 19, 8, 106]),
+    ('AB-12', [104, 33, 34, 13, 17, 18, 93, 106])
+])
+def test_symbol_values(text, values):
+    assert symbol_values(text) == values
+
+def test_encode_code128_modules():
+    bars, modules = encode_code128('0200330021')
+    # 11 modules per symbol, 13 for the stop symbol
+    assert modules == 6 * 11 + 11 + 13
+    # Start C is 211232: bars of 2, 1 and 3 modules at offsets 0, 3 and 6
+    assert bars[:3] == ((0, 2), (3, 1), (6, 3))
+    # The stop symbol ends in a two-module bar
+    assert bars[-1] == (modules - 2, 2)
+
+def test_unencodable_character():
+    with pytest.raises(ValueError):
+        symbol_values('é')
+
+def test_narrow_barcode_count():
+    df = pd.DataFrame({'STUDENT ID': ['0200330021', '0200330022', '7']})
+    _, modules = encode_code128('0200330021')
+    needed_width = (modules + 2 * quiet_zone) * min_module_width
+
+    # The default 18 mm column (16.7 mm after scaling to the page) is too narrow for ten-digit IDs
+    assert sheets.narrow_barcode_count(df) == 2
+    # Room taken from STUDENT NAME, as auto-fit does, so the columns still fit the page
+    extra = needed_width - sheets.column_widths['STUDENT ID']
+    wide_columns = dict(sheets.column_widths, **{'STUDENT ID': needed_width, 'STUDENT NAME': sheets.column_widths['STUDENT NAME'] - extra - 15})
+    assert sheets.narrow_barcode_count(df, {'column_widths': wide_columns}) == 0
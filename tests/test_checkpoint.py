@@ -0,0 +1,90 @@
+import os
+import threading
+import time
+
+import pytest
+
+from pdfcreator import checkpoint, sheets
+from tests.test_pagination import logo_path, school_frame
+
+def resumable_archive(df, result, job_root):
+    with open(logo_path, 'rb') as logo_file:
+        logo = logo_file.read()
+    return list(checkpoint.render_resumable_archive(df, result, logo, job_root=str(job_root), deterministic=True))[0]['data']
+
+def leftover_parts(job_root):
+    return [name for _, _, names in os.walk(job_root) for name in names if name.endswith('.part')]
+
+def test_concurrent_sessions_share_a_job(tmp_path):
+    df = school_frame([30, 5, 60, 0, 12], passcodes=True)
+    result = sheets.group_attendance_records(df)
+    archives, errors = [], []
+
+    def session():
+        try:
+            archives.append(resumable_archive(df, result, tmp_path))
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=session) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(archives) == 3 and archives[0] == archives[1] == archives[2]
+    assert leftover_parts(tmp_path) == []
+    [key] = os.listdir(tmp_path)
+    assert sorted(os.listdir(tmp_path / key)) == ['attendance_Sheets.zip', 'checkpoint.jsonl', 'manifest.json']
+
+def test_concurrent_atomic_writes(tmp_path):
+    path = str(tmp_path / 'entry.pdf')
+    errors = []
+
+    def write(data):
+        try:
+            for _ in range(50):
+                checkpoint.write_atomic(path, data)
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=write, args=(bytes([i]) * 1000,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert os.listdir(tmp_path) == ['entry.pdf']
+
+def test_failed_write_keeps_the_rest(tmp_path, monkeypatch):
+    df = school_frame([3, 4, 5], passcodes=False)
+    result = sheets.group_attendance_records(df)
+    record = checkpoint.JobDirectory.record
+
+    def flaky_record(job_dir, file_name, pdf_data):
+        if file_name == 'attendance_list_S001.pdf':
+            raise FileNotFoundError(file_name)
+        record(job_dir, file_name, pdf_data)
+
+    monkeypatch.setattr(checkpoint.JobDirectory, 'record', flaky_record)
+    with pytest.raises(RuntimeError, match='attendance_list_S001.pdf'):
+        resumable_archive(df, result, tmp_path)
+
+    # The rerun only renders the school that failed
+    monkeypatch.setattr(checkpoint.JobDirectory, 'record', record)
+    [key] = os.listdir(tmp_path)
+    with sheets.temporary_image(open(logo_path, 'rb').read()) as image_path:
+        summary = checkpoint.run_resumable_batch(df, result, image_path, checkpoint.JobDirectory(str(tmp_path), key), deterministic=True)
+    assert summary == {'rendered': 1, 'resumed': 2, 'failed': {}}
+
+def test_prune_job_dirs(tmp_path):
+    for key in ('old', 'kept', 'fresh'):
+        os.makedirs(tmp_path / key)
+        (tmp_path / key / 'checkpoint.jsonl').write_text('')
+    stale = time.time() - 30 * 24 * 60 * 60
+    for key in ('old', 'kept'):
+        os.utime(tmp_path / key / 'checkpoint.jsonl', (stale, stale))
+
+    assert checkpoint.prune_job_dirs(str(tmp_path), max_age_days=7, keep=('kept',)) == ['old']
+    assert sorted(os.listdir(tmp_path)) == ['fresh', 'kept']
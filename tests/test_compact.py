@@ -0,0 +1,76 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pdfcreator import layout, pagination, sheets
+from pdfcreator.compact import CompactRoster
+from pdfcreator.ids import parameter_mapping, process_data
+
+logo_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cg.png')
+
+@pytest.fixture(scope='module')
+def schools_excel(tmp_path_factory):
+    # Repeated and "NA" names, and schools with no or missing student counts
+    schools = pd.DataFrame({
+        'District': ['North', 'North', 'South', 'NA', 'South', 'North'],
+        'Block': ['B1', 'B2', 'B1', 'B3', 'NA', 'B1'],
+        'School_ID': ['S1', 'S2', 'S3', 'S4', 'S5', 'S1'],
+        'School': ['One', 'Two', 'Three', 'Four', 'Five', 'One'],
+        'Total_Students': [12, 0, 3, None, 25, 4]
+    })
+    path = tmp_path_factory.mktemp('compact') / 'schools.xlsx'
+    schools.to_excel(path, index=False)
+    return str(path)
+
+def id_options(param_set, grade=1):
+    # partner_id, buffer_percent, grade, district, block, school and student digits, parameter set
+    return (7, 30.0, grade, 2, 2, 3, 4, param_set)
+
+@pytest.mark.parametrize('param_set', list(parameter_mapping))
+def test_matches_process_data(schools_excel, param_set):
+    data_expanded, data_mapped = process_data(schools_excel, *id_options(param_set))
+    roster = CompactRoster.from_excel(schools_excel, *id_options(param_set))
+
+    assert len(roster) == len(data_mapped)
+    expanded = pd.concat(list(roster.iter_expanded_frames(chunk_rows=7)), ignore_index=True)
+    pd.testing.assert_frame_equal(expanded, data_expanded.reset_index(drop=True))
+
+    # Gender is random in both
+    mapped = pd.concat(list(roster.iter_mapped_frames(chunk_rows=7)), ignore_index=True)
+    pd.testing.assert_frame_equal(mapped.drop(columns='Gender'), data_mapped.drop(columns='Gender').reset_index(drop=True))
+    assert set(mapped['Gender']) <= {'Male', 'Female'}
+
+    records = sheets.group_attendance_records(sheets.prepare_attendance_data(data_mapped))
+    assert roster.attendance_records() == records
+    pd.testing.assert_series_equal(roster.rows_per_school(), data_expanded.groupby('School_ID').size(), check_names=False)
+    pd.testing.assert_series_equal(roster.custom_id_lengths(chunk_rows=7), data_expanded['Custom_ID'].str.len().value_counts().sort_index(), check_names=False)
+
+def test_passcodes(schools_excel):
+    roster = CompactRoster.from_excel(schools_excel, *id_options('A1'))
+    roster.add_passcodes(8)
+    mapped = roster.mapped_frame()
+    assert list(mapped.columns[:2]) == ['Roll_Number', 'PASSCODE']
+    assert mapped['PASSCODE'].str.len().eq(8).all()
+    assert list(roster.expanded_frame().columns[-2:]) == ['Custom_ID', 'PASSCODE']
+
+def test_grade_above_uint8(schools_excel):
+    _, data_mapped = process_data(schools_excel, *id_options('A2', grade=300))
+    roster = CompactRoster.from_excel(schools_excel, *id_options('A2', grade=300))
+    assert list(roster.mapped_frame()['Roll_Number']) == list(data_mapped['Roll_Number'])
+
+def test_renders_like_the_frame(schools_excel):
+    roster = CompactRoster.from_excel(schools_excel, *id_options('A3'))
+    roster.add_passcodes(10)
+    df = sheets.prepare_attendance_data(roster.mapped_frame())
+    result = roster.attendance_records()
+
+    roster_layout = sheets.batch_layout(roster, result, barcodes=True)
+    assert roster_layout == sheets.batch_layout(df, result, barcodes=True)
+    assert roster_layout['column_widths']['PASSCODE'] > layout.available_width * sheets.column_widths['PASSCODE'] / sum(sheets.column_widths.values())
+    assert sheets.narrow_barcode_count(roster) == sheets.narrow_barcode_count(df)
+
+    from_roster = list(pagination.render_school_pdfs(roster, result, logo_path, layout=roster_layout, barcodes=True, deterministic=True, parallel=False))
+    from_frame = list(pagination.render_school_pdfs(df, result, logo_path, layout=roster_layout, barcodes=True, deterministic=True, parallel=False))
+    assert from_roster == from_frame
@@ -0,0 +1,23 @@
+import pytest
+
+from pdfcreator import layout, sheets
+from tests.test_rosters import school_frame
+
+@pytest.mark.parametrize('passcode_length', [6, 8, 12])
+def test_autofit_fits_passcodes(passcode_length):
+    df = school_frame(2, students=5)
+    df['PASSCODE'] = 'W' * passcode_length
+    result = sheets.group_attendance_records(df)
+    fitted = layout.autofit_layout(df, result, sheets.column_widths, sheets.column_names)
+
+    widths = fitted['column_widths']
+    needed = layout.text_width('helvetica', fitted['row_font_size'], 'W' * passcode_length) + layout.cell_padding
+    assert widths['PASSCODE'] >= needed - 1e-9
+    assert fitted['row_font_size'] == layout.row_font_size
+    assert sum(widths.values()) == pytest.approx(layout.available_width)
+
+def test_autofit_leaves_default_widths_for_short_values():
+    df = school_frame(1, students=3)
+    df['PASSCODE'] = 'P1'
+    fitted = layout.autofit_layout(df, sheets.group_attendance_records(df), sheets.column_widths, sheets.column_names)
+    assert fitted['column_widths'] == sheets.scale_column_widths(sheets.column_widths, sheets.column_names)
@@ -0,0 +1,82 @@
+import glob
+import os
+import tempfile
+
+import pandas as pd
+import pytest
+
+from pdfcreator import pagination, scheduler, sheets
+
+logo_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cg.png')
+
+@pytest.mark.parametrize('student_count, pages', [
+    (0, [(0, 0)]),
+    (20, [(0, 20)]),
+    (21, [(0, 20), (20, 21)]),
+    (45, [(0, 20), (20, 45)]),
+    (46, [(0, 20), (20, 45), (45, 46)])
+])
+def test_plan_pages(student_count, pages):
+    # 20 rows under the title block, 25 on every later page
+    assert (pagination.first_page_rows, pagination.continuation_page_rows) == (20, 25)
+    assert pagination.plan_pages(student_count) == pages
+    assert pagination.page_count(student_count) == len(pages)
+
+def test_task_ranges():
+    pages = pagination.page_count(1000)
+    ranges = pagination.task_ranges(1000)
+    assert ranges[0][0] == 0 and ranges[-1][1] == pages
+    assert all(last - first <= pagination.pages_per_task for first, last in ranges)
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+
+def school_frame(student_counts, passcodes):
+    rows = [
+        {'STUDENT ID': f'{school:03d}01{i:04d}', 'School Code': f'S{school:03d}', 'SCHOOL NAME': f'School {school}',
+         'DISTRICT': 'North', 'BLOCK': f'B{school % 3}', 'CLASS': 1}
+        for school, count in enumerate(student_counts) for i in range(count)
+    ]
+    df = pd.DataFrame(rows)
+    if passcodes:
+        df['PASSCODE'] = [f'P{i:06d}' for i in range(len(df))]
+    return df
+
+def shared_dirs():
+    return set(glob.glob(os.path.join(tempfile.gettempdir(), 'pdfcreator_shared_*')))
+
+@pytest.fixture
+def render_pool(monkeypatch):
+    # Two render processes whatever the machine, small windows and tasks so every path is taken
+    monkeypatch.setenv('PDFCREATOR_RENDER_PROCESSES', '2')
+    monkeypatch.setattr(scheduler, '_render_processes', None)
+    monkeypatch.setattr(scheduler, '_render_pool', None)
+    monkeypatch.setattr(pagination, 'schools_per_window', 3)
+    monkeypatch.setattr(pagination, 'pages_per_task', 2)
+    yield
+    if scheduler._render_pool is not None:
+        scheduler._render_pool.shutdown()
+
+@pytest.mark.parametrize('passcodes', [False, True])
+def test_pooled_output_matches_local(render_pool, passcodes):
+    # Filled school by school with no students on some pages, several tasks on others
+    df = school_frame([3, 46, 0, 130, 21, 1, 45, 260, 20, 2], passcodes)
+    df.loc[len(df)] = {'School Code': 'S099', 'SCHOOL NAME': 'Empty', 'DISTRICT': 'North', 'BLOCK': 'B0', 'CLASS': 1}
+    result = sheets.group_attendance_records(df)
+    before = shared_dirs()
+
+    local = list(pagination.render_school_pdfs(df, result, logo_path, deterministic=True, parallel=False))
+    pooled = list(pagination.render_school_pdfs(df, result, logo_path, deterministic=True))
+    assert scheduler.get_render_pool() is not None
+    assert len(pooled) == len(result)
+    assert pooled == local
+    assert shared_dirs() == before
+
+def test_pooled_early_stop_cleans_up(render_pool):
+    df = school_frame([30] * 12, passcodes=True)
+    result = sheets.group_attendance_records(df)
+    before = shared_dirs()
+
+    pdfs = pagination.render_school_pdfs(df, result, logo_path, deterministic=True)
+    first = next(pdfs)
+    pdfs.close()
+    assert first == sheets.render_school_pdf(df, result[0], logo_path, deterministic=True)
+    assert shared_dirs() == before
@@ -0,0 +1,41 @@
+import io
+import resource
+import zipfile
+
+import pandas as pd
+import pytest
+
+from pdfcreator import rosters, sheets
+
+def school_frame(schools, students=1):
+    return pd.DataFrame([
+        {'STUDENT ID': f'{school:04d}01{i:04d}', 'PASSCODE': f'P{school}{i}', 'School Code': f'S{school:04d}',
+         'SCHOOL NAME': f'School {school}', 'DISTRICT': 'North', 'BLOCK': 'B1', 'CLASS': 1}
+        for school in range(schools) for i in range(students)
+    ])
+
+@pytest.fixture
+def file_limit():
+    # The usual default soft limit, so the test fails the same way everywhere
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (min(1024, hard), hard))
+    yield
+    resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+
+def test_sheet_per_school_workbook_beyond_file_limit(file_limit):
+    df = school_frame(1100)
+    result = sheets.group_attendance_records(df)
+    data = rosters.write_roster_workbook(df, result, deterministic=True)
+    with zipfile.ZipFile(io.BytesIO(data)) as workbook:
+        sheet_files = [name for name in workbook.namelist() if name.startswith('xl/worksheets/sheet')]
+    assert len(sheet_files) == 1100
+
+def test_sheet_names_are_unique_and_valid():
+    used = set()
+    names = [rosters.sheet_name({'School Code': code}, used) for code in ['A/B', 'a_b', 'x' * 40, 'x' * 40]]
+    assert names[0] == 'A_B' and names[1] == 'a_b_2'
+    assert all(len(name) <= 31 for name in names) and len({name.lower() for name in names}) == 4
+
+def test_roster_path():
+    assert rosters.roster_path('North/B1/attendance_list_S0001.pdf') == 'North/B1/roster_S0001.xlsx'
+    assert rosters.roster_path('attendance_list_S0001.pdf') == 'roster_S0001.xlsx'
@@ -0,0 +1,143 @@
+import io
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+import zipfile
+
+import pandas as pd
+import pytest
+
+from pdfcreator.service import make_server
+
+logo_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cg.png')
+
+@pytest.fixture
+def server(tmp_path):
+    server = make_server(port=0, upload_dir=str(tmp_path / 'uploads'), output_dir=str(tmp_path))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    server.service.close()
+
+@pytest.fixture
+def base_url(server):
+    return f'http://127.0.0.1:{server.server_address[1]}'
+
+def call(url, body=None, method=None):
+    if isinstance(body, dict):
+        body = json.dumps(body).encode('utf-8')
+    request = urllib.request.Request(url, data=body, method=method)
+    with urllib.request.urlopen(request, timeout=60) as response:
+        return response.status, response.read()
+
+def post_json(url, payload):
+    status, body = call(url, payload)
+    return status, json.loads(body)
+
+def wait_for(base_url, job_id):
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        status = json.loads(call(f'{base_url}/jobs/{job_id}')[1])
+        if status['state'] in ('done', 'failed'):
+            return status
+        time.sleep(0.1)
+    raise AssertionError(f'job {job_id} did not finish')
+
+def excel_upload(base_url):
+    schools = pd.DataFrame({
+        'District': ['North', 'North', 'South'],
+        'Block': ['B1', 'B2', 'B1'],
+        'School_ID': ['S1', 'S2', 'S3'],
+        'School': ['First School', 'Second School', 'Third School'],
+        'Total_Students': [10, 4, 0]
+    })
+    buffer = io.BytesIO()
+    schools.to_excel(buffer, index=False)
+    status, upload = post_json(f'{base_url}/uploads', buffer.getvalue())
+    assert status == 201
+    return upload['upload']
+
+def test_upload_ids_sheets_output(base_url):
+    excel = excel_upload(base_url)
+    with open(logo_path, 'rb') as logo_file:
+        logo = post_json(f'{base_url}/uploads', logo_file.read())[1]['upload']
+
+    status, ids_job = post_json(f'{base_url}/jobs/ids', {'excel': excel, 'passcodes': True})
+    assert status == 202
+    ids_status = wait_for(base_url, ids_job['job'])
+    assert ids_status['state'] == 'done', ids_status['error']
+    assert [output['name'] for output in ids_status['outputs']] == ['student_ids', 'mapped_ids']
+
+    status, sheets_job = post_json(f'{base_url}/jobs/sheets', {'ids_job': ids_job['job'], 'logo': logo, 'autofit': False})
+    assert status == 202
+    sheets_status = wait_for(base_url, sheets_job['job'])
+    assert sheets_status['state'] == 'done', sheets_status['error']
+
+    status, data = call(f"{base_url}/jobs/{sheets_job['job']}/outputs/attendance_Sheets")
+    assert status == 200
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        names = archive.namelist()
+        assert len(names) == 3
+        assert all(name.endswith('.pdf') and archive.read(name).startswith(b'%PDF') for name in names)
+
+    # Uploads can be removed once no job needs them
+    assert json.loads(call(f'{base_url}/uploads/{excel}', method='DELETE')[1])['deleted']
+    with pytest.raises(urllib.error.HTTPError) as error:
+        post_json(f'{base_url}/jobs/ids', {'excel': excel})
+    assert error.value.code == 400
+
+def test_outputs_are_files_removed_with_their_job(server, base_url, monkeypatch):
+    from pdfcreator import service
+
+    excel = excel_upload(base_url)
+    first = post_json(f'{base_url}/jobs/ids', {'excel': excel})[1]['job']
+    assert wait_for(base_url, first)['state'] == 'done'
+    job_dir = server.service.jobs[first]['dir']
+    outputs = server.service.jobs[first]['job'].outputs
+    assert all('data' not in output and os.path.dirname(output['path']) == job_dir for output in outputs)
+    assert sorted(os.listdir(job_dir)) == ['Student_Ids.xlsx', 'Student_Ids_Mapped.xlsx']
+
+    status, data = call(f'{base_url}/jobs/{first}/outputs/mapped_ids')
+    with open(os.path.join(job_dir, 'Student_Ids_Mapped.xlsx'), 'rb') as output_file:
+        assert data == output_file.read()
+
+    # Over the limit, the next submission forgets the finished job and deletes its files
+    monkeypatch.setattr(service, 'max_kept_output_bytes', 0)
+    post_json(f'{base_url}/jobs/ids', {'excel': excel})
+    assert first not in server.service.jobs
+    assert not os.path.exists(job_dir)
+
+@pytest.mark.parametrize('payload', [
+    {'max_volume_mb': 'abc', 'mode': 'volumes'},
+    {'max_volume_mb': 0, 'mode': 'volumes'},
+    {'autofit': 'false'},
+    {'barcodes': 1}
+])
+def test_sheets_options_are_validated(base_url, payload):
+    excel = excel_upload(base_url)
+    with pytest.raises(urllib.error.HTTPError) as error:
+        post_json(f'{base_url}/jobs/sheets', dict(payload, excel=excel, logo=excel))
+    assert error.value.code == 400
+
+@pytest.mark.parametrize('payload', [{'grade': 'x'}, {'student_digits': 0}, {'passcodes': 'no'}, {'buffer_percent': 101}])
+def test_ids_options_are_validated(base_url, payload):
+    excel = excel_upload(base_url)
+    with pytest.raises(urllib.error.HTTPError) as error:
+        post_json(f'{base_url}/jobs/ids', dict(payload, excel=excel))
+    assert error.value.code == 400
+
+def test_bad_content_length(base_url):
+    import http.client
+
+    host, port = base_url.rsplit('/', 1)[1].split(':')
+    connection = http.client.HTTPConnection(host, int(port), timeout=10)
+    connection.putrequest('POST', '/uploads')
+    connection.putheader('Content-Length', 'abc')
+    connection.endheaders()
+    assert connection.getresponse().status == 400
+    connection.close()
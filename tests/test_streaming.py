@@ -0,0 +1,62 @@
+import io
+import os
+
+import pandas as pd
+import pytest
+
+from pdfcreator import fonts, pagination, sheets
+from pdfcreator.pdf import AttendancePDF, StreamingUnsupported
+
+logo_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cg.png')
+# Any TTF font, configured the same way as for the apps
+ttf_path = fonts.default_font_path()
+
+def school_parts(image_path, font_path=None):
+    # Enough students for several render tasks, so continuation pages are merged too
+    student_count = 400
+    df = pd.DataFrame({
+        'STUDENT ID': [f'00101{i:04d}' for i in range(student_count)],
+        'PASSCODE': [f'P{i:05d}' for i in range(student_count)],
+        'School Code': '001',
+        'SCHOOL NAME': 'First School',
+        'DISTRICT': 'North',
+        'BLOCK': 'B1',
+        'CLASS': 1
+    })
+    result = sheets.group_attendance_records(df)
+    assert len(pagination.task_ranges(result[0]['student_count'])) > 1
+    return next(pagination.iter_school_parts(df, result, image_path, font_path=font_path, deterministic=True, parallel=False))
+
+def streamed(parts):
+    stream = io.BytesIO()
+    written = pagination.merge_school(parts, stream)
+    assert written == len(stream.getvalue())
+    return stream.getvalue()
+
+def test_streamed_matches_output_with_image():
+    expected = pagination.merge_school(school_parts(logo_path))
+    assert expected.startswith(b'%PDF') and b'/Subtype /Image' in expected
+    assert streamed(school_parts(logo_path)) == expected
+
+@pytest.mark.skipif(not ttf_path or not os.path.exists(ttf_path), reason=f"set {fonts.unicode_font_env} to a TTF font")
+def test_streamed_matches_output_with_ttf_font():
+    expected = pagination.merge_school(school_parts(logo_path, ttf_path))
+    assert b'/FontFile2' in expected
+    assert streamed(school_parts(logo_path, ttf_path)) == expected
+
+def test_unsupported_streaming_falls_back(monkeypatch):
+    expected = pagination.merge_school(school_parts(logo_path))
+
+    def start_stream(self, stream):
+        raise StreamingUnsupported("Streaming output needs fpdf 1.7")
+
+    monkeypatch.setattr(AttendancePDF, 'start_stream', start_stream)
+    assert streamed(school_parts(logo_path)) == expected
+
+def test_other_stream_errors_are_not_swallowed(monkeypatch):
+    def start_stream(self, stream):
+        raise NotImplementedError("a bug, not a missing feature")
+
+    monkeypatch.setattr(AttendancePDF, 'start_stream', start_stream)
+    with pytest.raises(NotImplementedError):
+        streamed(school_parts(logo_path))